@@ -33,6 +33,23 @@ def create_app(config_class=DevelopmentConfig):
     migrate.init_app(app, db)
     ma.init_app(app)
 
+    # Initialize response cache
+    from app.utils.cache import init_cache
+    init_cache(app)
+    from app.utils import invalidation  # Invalidates cache tags on commit
+
+    # Compress large responses
+    from app.utils.compression import init_compression
+    init_compression(app)
+
+    # Verify each token once and resolve the authenticated user once per request
+    from app.utils.tokens import init_tokens
+    init_tokens(app)
+    from app.utils.identity import init_identity
+    init_identity(app)
+    from app.utils.blocklist import init_blocklist
+    init_blocklist(app)
+
     # Configure Celery
     celery.conf.update(
         task_serializer='json',
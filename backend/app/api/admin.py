@@ -1,22 +1,28 @@
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
 from app.models import User, Professional, Service, ServiceRequest, Customer, Admin, ProfessionalDocument
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from ..schemas import (
     UserSchema, CustomerSchema, ProfessionalSchema, ServiceSchema,
     ServiceRequestSchema, AdminSchema, ProfessionalDocumentSchema
 )
 from app.extensions import db
 from app.utils.auth import admin_required, user_required
+from app.utils.identity import current_account
 from app.utils.errors import APIError, error_wrapper, ValidationAPIError, ResourceNotFoundError
-from app.utils.api import paginate_query, filter_query
+from app.utils.api import paginate_query, filter_query, batch_ids, batch_response, load_entities
 from datetime import datetime, timedelta
 import pytz
 import os
 from app.utils.cache import user_cache
+from app.utils.compression import compress
+from app.utils.catalog import service_catalog
+from app.utils import metrics
 from sqlalchemy import func
 
 bp = Blueprint('admin', __name__)
 
+LIST_COMPRESS_LEVEL = 4  # large list payloads favour speed over ratio
+
 def init_upload_dir(state):
     """Create upload directory if it doesn't exist"""
     app = state.app
@@ -61,6 +67,7 @@ def update_user_status(user_id):
     return handle_request()
 
 @bp.route('/users', methods=['GET'])
+@compress(level=LIST_COMPRESS_LEVEL)
 @jwt_required()
 @admin_required()
 @error_wrapper
@@ -92,9 +99,19 @@ def get_users():
         query = query.filter_by(type=type)
 
     query = apply_search_filter(query, User)
-    return paginate_query(query, UserSchema(many=True))
+    return paginate_query(query, UserSchema(many=True), keyset=(User.id,), project=True, streamable=True)
+
+@bp.route('/users/batch', methods=['GET'])
+@jwt_required()
+@admin_required()
+@error_wrapper
+def get_users_batch():
+    """Get several users by id"""
+    ids = batch_ids()
+    return batch_response(ids, load_entities(User, UserSchema(), ids, tags=('users',)))
 
 @bp.route('/professionals', methods=['GET'])
+@compress(level=LIST_COMPRESS_LEVEL)
 @jwt_required()
 @admin_required()
 @error_wrapper
@@ -116,9 +133,10 @@ def get_professionals():
             query = query.filter_by(**{key: value})
 
     query = apply_search_filter(query, Professional)
-    return paginate_query(query, ProfessionalSchema(many=True))
+    return paginate_query(query, ProfessionalSchema(many=True), project=True, streamable=True)
 
 @bp.route('/customers', methods=['GET'])
+@compress(level=LIST_COMPRESS_LEVEL)
 @jwt_required()
 @admin_required()
 @error_wrapper
@@ -130,7 +148,7 @@ def get_customers():
         query = query.filter_by(status=status)
 
     query = apply_search_filter(query, Customer)
-    return paginate_query(query, CustomerSchema(many=True))
+    return paginate_query(query, CustomerSchema(many=True), project=True, streamable=True)
 
 @bp.route('/professionals/<int:professional_id>/verify', methods=['POST'])
 @jwt_required()
@@ -147,8 +165,7 @@ def verify_professional(professional_id):
         raise APIError('Professional not found', 404)
 
     # Get admin user
-    admin_email = get_jwt_identity()
-    admin = Admin.query.filter_by(email=admin_email).first()
+    admin = current_account(Admin)
     if not admin:
         raise APIError('Admin not found', 404)
 
@@ -269,6 +286,7 @@ def unassign_request(request_id):
     return ServiceRequestSchema().dump(service_request)
 
 @bp.route('/requests', methods=['GET'])
+@compress(level=LIST_COMPRESS_LEVEL)
 @jwt_required()
 @admin_required()
 @error_wrapper
@@ -283,7 +301,9 @@ def get_requests():
     
     query = ServiceRequest.query
     filtered_query = filter_query(query, ServiceRequest, **{k: v for k, v in filters.items() if v is not None})
-    return paginate_query(filtered_query, ServiceRequestSchema(many=True))
+    return paginate_query(filtered_query, ServiceRequestSchema(many=True),
+                          keyset=(ServiceRequest.request_date, ServiceRequest.id),
+                          project=True, streamable=True)
 
 @bp.route('/professionals/<int:professional_id>/documents', methods=['GET'])
 @jwt_required()
@@ -314,6 +334,7 @@ def get_professional_documents(professional_id):
     return jsonify(documents)
 
 @bp.route('/documents/<path:filepath>', methods=['GET'])
+@compress(enabled=False)  # Uploaded documents are already compressed
 @jwt_required()
 @admin_required()
 @error_wrapper
@@ -352,7 +373,7 @@ def get_document_file(filepath):
 @jwt_required()
 @admin_required()
 @error_wrapper
-@user_cache(timeout=300)
+@user_cache(timeout=300, tags=['stats'], defaults={'days': '30'}, stale_ttl=60, early_refresh=1.0)
 def get_dashboard_stats():
     """Get admin dashboard statistics"""
     # Get date range from query params
@@ -389,14 +410,22 @@ def get_dashboard_stats():
         'completed_requests': completed_requests
     }
 
+@bp.route('/metrics', methods=['GET'])
+@jwt_required()
+@admin_required()
+@error_wrapper
+def get_metrics():
+    """Expose cache metrics in the Prometheus text format"""
+    body, content_type = metrics.render()
+    return current_app.response_class(body, content_type=content_type)
+
 @bp.route('/export/service-requests', methods=['POST'])
 @jwt_required()
 @admin_required()
 @error_wrapper
 def export_service_requests():
     """Trigger export of service requests to CSV"""
-    current_user = get_jwt_identity()
-    admin = Admin.query.get(current_user)
+    admin = current_account(Admin)
     
     if not admin or not admin.email:
         return jsonify({'message': 'Admin email not found'}), 400
@@ -433,45 +462,15 @@ def export_service_requests_prof(prof_id):
 def get_admin_services():
     """Get all services with pagination for admin"""
     try:
-        query = Service.query
-
-        # Search by name or description
-        search = request.args.get('search')
-        if search:
-            search_term = f"%{search.lower()}%"
-            query = query.filter(
-                db.or_(
-                    func.lower(Service.name).like(search_term),
-                    func.lower(Service.description).like(search_term),
-                    func.lower(Service.type).like(search_term)
-                )
-            )
-
-        # Filter by type if provided
-        service_type = request.args.get('type')
-        if service_type:
-            query = query.filter(func.lower(Service.type) == service_type.lower())
-
-        # Filter by price range
         min_price = request.args.get('minPrice')
         max_price = request.args.get('maxPrice')
-        if min_price:
-            query = query.filter(Service.price >= float(min_price))
-        if max_price:
-            query = query.filter(Service.price <= float(max_price))
-
-        # Sort by different criteria
-        sort_by = request.args.get('sortBy', 'name')
-        if sort_by == 'price_low':
-            query = query.order_by(Service.price.asc())
-        elif sort_by == 'price_high':
-            query = query.order_by(Service.price.desc())
-        else:  # default to name
-            query = query.order_by(Service.name.asc())
-
-        services = query.all()
-        schema = ServiceSchema(many=True)
-        result = schema.dump(services)
+        result = service_catalog.services(
+            search=request.args.get('search'),
+            service_type=request.args.get('type'),
+            min_price=float(min_price) if min_price else None,
+            max_price=float(max_price) if max_price else None,
+            sort_by=request.args.get('sortBy', 'name')
+        )
         return jsonify({
             "items": result,
             "total": len(result)
@@ -7,6 +7,8 @@ from ..schemas import (UserSchema, CustomerSchema, ProfessionalSchema, AdminSche
 from ..utils.errors import error_wrapper, APIError, ValidationAPIError, AuthorizationError, ForbiddenError
 from ..utils.validation import DocumentValidator, UserValidator
 from ..utils.response import APIResponse
+from ..utils.identity import current_user, token_claims
+from ..utils.passwords import HashingOverloaded
 from marshmallow import ValidationError
 
 bp = Blueprint('auth', __name__)
@@ -162,7 +164,7 @@ def register():
         # Generate access token for non-professional users
         access_token = None
         if user_type != 'professional':
-            access_token = create_access_token(identity=user.email)
+            access_token = create_access_token(identity=user.email, additional_claims=token_claims(user))
         
         # Create response
         response_data = create_user_response(user, access_token)
@@ -170,6 +172,8 @@ def register():
         
     except ValidationAPIError as e:
         return jsonify(e.errors), 400
+    except HashingOverloaded:
+        raise
     except Exception as e:
         current_app.logger.error(f"Registration error: {str(e)}")
         return jsonify({'message': 'An unexpected error occurred'}), 500
@@ -197,6 +201,15 @@ def login():
             
         if not user.active:
             raise APIError('Account is blocked', 401)
+
+        # Upgrade hashes made with older parameters while we have the password
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except HashingOverloaded:
+                # The password checked out; upgrade on a later, quieter login
+                current_app.logger.warning(f"Skipped password rehash for user {user.id}: hashing pool busy")
             
         # For professionals, check registration status
         if isinstance(user, Professional):
@@ -208,11 +221,13 @@ def login():
                 return jsonify({'message': 'Your account status is invalid'}), 403
         
         # Create access token and response
-        access_token = create_access_token(identity=user.email)
+        access_token = create_access_token(identity=user.email, additional_claims=token_claims(user))
         response_data = create_user_response(user, access_token)
         
         return jsonify(response_data), 200
         
+    except APIError:
+        raise
     except Exception as e:
         current_app.logger.error(f"Login error: {str(e)}")
         return jsonify({'message': 'An unexpected error occurred'}), 500
@@ -222,8 +237,7 @@ def login():
 @error_wrapper
 def get_profile():
     """Get user profile"""
-    current_user_email = get_jwt_identity()
-    user = User.query.filter_by(email=current_user_email).first_or_404()
+    user = current_user() or abort(404)
     return jsonify(create_user_response(user))
 
 @bp.route('/profile', methods=['PUT'])
@@ -231,8 +245,7 @@ def get_profile():
 @error_wrapper
 def update_profile():
     """Update user profile"""
-    current_user_email = get_jwt_identity()
-    user = User.query.filter_by(email=current_user_email).first_or_404()
+    user = current_user() or abort(404)
     
     data = request.get_json()
     
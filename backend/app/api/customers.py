@@ -6,25 +6,38 @@ from ..schemas import (CustomerSchema, CustomerProfileSchema, ServiceSchema, Ser
                     CreateServiceRequestSchema)
 from ..utils.errors import error_wrapper, APIError
 from ..utils.auth import customer_required
-from ..utils.api import paginate_query, validate_schema, get_or_404
+from ..utils.identity import current_account
+from ..utils.api import (paginate_query, paginate_list, validate_schema, get_or_404, sparse_schema,
+                         batch_ids, batch_response, load_entities, eager_load)
+from ..utils.serializers import fast_dump
 from ..utils.search import Search
 from ..utils.stats import Statistics
-from ..utils.cache import cache, invalidate_cache, user_cache
+from ..utils.cache import cache, user_cache, user_memoize
+from ..utils.catalog import service_catalog
 from datetime import datetime, timezone
 import logging
 
 bp = Blueprint('customers', __name__)
 
+DASHBOARD_TIMEOUT = 300
+DASHBOARD_RECENT_REQUESTS = 5
+
+# A request payload embeds its service, customer and professional
+REQUEST_PAYLOAD_TAGS = ('requests', 'services', 'users')
+
 def get_current_customer():
-    """Get current customer from JWT token"""
-    email = get_jwt_identity()
-    customer = Customer.query.filter_by(email=email).first()
+    """Id, email and active flag of the current customer, without loading its row"""
+    customer = current_account(Customer)
     if not customer:
         raise APIError('Customer not found', 404)
     if not customer.active:
         raise APIError('Account is inactive', 403)
     return customer
 
+def load_current_customer():
+    """The current customer's row, for views that read or change its columns"""
+    return db.session.get(Customer, get_current_customer().id)
+
 def get_customer_request(request_id, customer_id):
     """Get and validate customer's service request"""
     request = ServiceRequest.query.filter_by(id=request_id).first()
@@ -47,7 +60,10 @@ def validate_request_status(request, allowed_statuses):
 @user_cache(timeout=300)
 def get_profile():
     """Get customer profile"""
-    customer = get_current_customer()
+    return profile_payload(load_current_customer())
+
+def profile_payload(customer):
+    """Profile section shared by the profile and dashboard endpoints"""
     return {
         'user': CustomerSchema().dump(customer),
         'address': customer.address,
@@ -61,7 +77,7 @@ def get_profile():
 @validate_schema(CustomerProfileSchema)
 def update_profile(data):
     """Update customer profile"""
-    customer = get_current_customer()
+    customer = load_current_customer()
     
     # Update fields
     for key, value in data.items():
@@ -69,7 +85,6 @@ def update_profile(data):
             setattr(customer, key, value)
     
     db.session.commit()
-    invalidate_cache('get_profile')
     return CustomerSchema().dump(customer)
 
 # Service Discovery
@@ -79,56 +94,28 @@ def update_profile(data):
 @error_wrapper
 def list_services():
     """List available services with optional filtering"""
-    filters = {
-        'type': request.args.get('type'),
-        'search': request.args.get('search'),
-        'min_price': request.args.get('min_price', type=float),
-        'max_price': request.args.get('max_price', type=float),
-        'location': request.args.get('location')
-    }
-    
-    query = Service.query
-    if filters.get('search'):
-        search_term = f"%{filters['search']}%"
-        query = query.filter(
-            or_(
-                Service.name.ilike(search_term),
-                Service.description.ilike(search_term)
-            )
-        )
-    
-    if filters.get('type'):
-        query = query.filter(Service.type == filters['type'])
-    
-    if filters.get('min_price'):
-        query = query.filter(Service.price >= filters['min_price'])
-    
-    if filters.get('max_price'):
-        query = query.filter(Service.price <= filters['max_price'])
-    
-    return paginate_query(query, ServiceSchema(many=True))
+    services = service_catalog.services(
+        search=request.args.get('search'),
+        search_fields=('name', 'description'),
+        service_type=request.args.get('type'),
+        min_price=request.args.get('min_price', type=float) or None,
+        max_price=request.args.get('max_price', type=float) or None,
+        sort_by='id'
+    )
+    return paginate_list(services)
 
 @bp.route('/services/categories', methods=['GET'])
 @jwt_required()
 @customer_required()
 @error_wrapper
+@cache(timeout=300, tags=['services'])
 def list_service_categories():
     """Get all available service categories for customers"""
-    categories = db.session.query(Service.type).distinct().all()
-    
-    # Format categories with name and description
-    formatted_categories = {
-        'items': [
-            {
-                'type': type_name,
-                'name': type_name.capitalize() + ' Services',
-                'description': f'Professional {type_name} services for your needs'
-            } for (type_name,) in categories
-        ],
+    categories = service_catalog.categories()
+    return {
+        'items': categories,
         'total': len(categories)
     }
-    
-    return jsonify(formatted_categories)
 
 @bp.route('/requests', methods=['GET'])
 @jwt_required()
@@ -162,8 +149,11 @@ def list_requests():
         query = query.order_by(ServiceRequest.request_date.desc())
         
         # Return paginated results
-        return paginate_query(query, ServiceRequestSchema(many=True))
+        return paginate_query(query, ServiceRequestSchema(many=True),
+                              keyset=(ServiceRequest.request_date, ServiceRequest.id), project=True)
         
+    except APIError:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error in list_requests: {str(e)}")
         raise APIError("Error retrieving service requests", 500)
@@ -189,11 +179,22 @@ def create_request(data):
     db.session.add(service_request)
     db.session.commit()
 
-    # Invalidate stats cache
-    invalidate_cache('get_stats*')
-
     return ServiceRequestSchema().dump(service_request), 201
 
+@bp.route('/requests/batch', methods=['GET'])
+@jwt_required()
+@customer_required()
+@error_wrapper
+def get_requests_batch():
+    """Get several of the customer's service requests by id"""
+    customer = get_current_customer()
+    ids = batch_ids()
+    requests = load_entities(ServiceRequest, ServiceRequestSchema(), ids, tags=REQUEST_PAYLOAD_TAGS)
+    # Requests of other customers are reported as missing
+    owned = {request_id: payload for request_id, payload in requests.items()
+             if payload['customer_id'] == customer.id}
+    return batch_response(ids, owned)
+
 @bp.route('/requests/<int:request_id>', methods=['GET'])
 @jwt_required()
 @customer_required()
@@ -202,7 +203,7 @@ def get_request(request_id):
     """Get service request details"""
     customer = get_current_customer()
     request = get_customer_request(request_id, customer.id)
-    return ServiceRequestSchema().dump(request)
+    return sparse_schema(ServiceRequestSchema()).dump(request)
 
 @bp.route('/requests/<int:request_id>/cancel', methods=['POST'])
 @jwt_required()
@@ -217,9 +218,6 @@ def cancel_request(request_id):
     request.status = 'cancelled'
     db.session.commit()
 
-    # Invalidate stats cache
-    invalidate_cache('get_stats*')
-
     return ServiceRequestSchema().dump(request)
 
 @bp.route('/requests/<int:request_id>/complete', methods=['POST'])
@@ -236,28 +234,15 @@ def complete_request(request_id):
     request.completion_date = datetime.now()
     db.session.commit()
 
-    # Invalidate stats cache
-    invalidate_cache('get_stats*')
-
     return ServiceRequestSchema().dump(request)
 
 @bp.route('/requests/<int:request_id>/rate', methods=['POST'])
 @jwt_required()
 def rate_request(request_id):
     try:
-        # Get current user ID from JWT token
-        current_user_email = get_jwt_identity()
-        current_app.logger.info(f"Current user email from token: {current_user_email}")
-        
-        # First get the user, then get the customer
-        user = User.query.filter_by(email=current_user_email).first()
-        if not user:
-            current_app.logger.error(f"User not found for email: {current_user_email}")
-            return jsonify({'error': 'User not found'}), 404
-            
-        customer = Customer.query.get(user.id)
+        customer = current_account(Customer)
         if not customer:
-            current_app.logger.error(f"Customer not found for user ID: {user.id}")
+            current_app.logger.error(f"Customer not found for email: {get_jwt_identity()}")
             return jsonify({'error': 'Customer not found'}), 404
 
         # Get service request
@@ -356,13 +341,16 @@ def close_request(request_id):
 @jwt_required()
 @customer_required()
 @error_wrapper
-@user_cache(timeout=300)
+@user_cache(timeout=300, tags=['stats'], defaults={'days': '30'}, stale_ttl=60, early_refresh=1.0)
 def get_stats():
     """Get customer dashboard statistics"""
     customer = get_current_customer()
-    days = request.args.get('days', 30, type=int)
-    stats = Statistics.get_customer_stats(customer.id, days)
-    
+    return stats_payload(customer.id, request.args.get('days', 30, type=int))
+
+def stats_payload(customer_id, days):
+    """Stats section shared by the stats and dashboard endpoints"""
+    stats = Statistics.get_customer_stats(customer_id, days)
+
     # Transform stats to match expected format
     status_counts = stats['status_counts']
     return {
@@ -373,3 +361,37 @@ def get_stats():
         'total_spending': stats['total_spending'],
         'rating_rate': stats['rating_rate']
     }
+
+# Each dashboard section is cached on its own so a change only rebuilds
+# the sections it affects
+@user_memoize(timeout=DASHBOARD_TIMEOUT)
+def dashboard_profile(customer_id):
+    return profile_payload(db.session.get(Customer, customer_id))
+
+@user_memoize(timeout=DASHBOARD_TIMEOUT, tags=['stats'], stale_ttl=60, early_refresh=1.0)
+def dashboard_stats(customer_id, days):
+    return stats_payload(customer_id, days)
+
+# The customer's own tag covers their requests; the rest covers what they embed
+@user_memoize(timeout=DASHBOARD_TIMEOUT, tags=['services', 'users'])
+def dashboard_requests(customer_id):
+    query = (ServiceRequest.query.filter_by(customer_id=customer_id)
+             .order_by(ServiceRequest.request_date.desc(), ServiceRequest.id.desc())
+             .limit(DASHBOARD_RECENT_REQUESTS))
+    schema = ServiceRequestSchema(many=True)
+    return fast_dump(schema, eager_load(query, schema).all())
+
+@bp.route('/dashboard', methods=['GET'])
+@jwt_required()
+@customer_required()
+@error_wrapper
+def get_dashboard():
+    """Get the profile, stats, recent requests and categories in one call"""
+    customer = get_current_customer()
+    days = request.args.get('days', 30, type=int)
+    return {
+        'profile': dashboard_profile(customer.id),
+        'stats': dashboard_stats(customer.id, days),
+        'recent_requests': dashboard_requests(customer.id),
+        'categories': service_catalog.categories()
+    }
@@ -1,14 +1,16 @@
 from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from sqlalchemy import or_
 from ..models import Professional, Service, ServiceRequest, ProfessionalDocument, Admin, db
 from ..schemas import (ProfessionalSchema, ServiceSchema, ServiceRequestSchema, ProfessionalDocumentSchema)
 from ..utils.errors import error_wrapper, APIError
 from ..utils.auth import professional_required, admin_required
-from ..utils.api import (paginate_query, get_or_404, validate_request_status)
+from ..utils.identity import current_account
+from ..utils.api import (paginate_query, get_or_404, sparse_schema, validate_request_status, eager_load)
+from ..utils.serializers import fast_dump
 from ..utils.search import Search
 from ..utils.stats import Statistics
-from ..utils.cache import cache, invalidate_cache, user_cache
+from ..utils.cache import cache, user_cache, user_memoize
 from datetime import datetime, timezone
 import logging
 import os
@@ -18,6 +20,7 @@ bp = Blueprint('professionals', __name__)
 logger = logging.getLogger(__name__)
 
 CACHE_TIMEOUT = 300
+DASHBOARD_BUCKET_SIZE = 5  # most recent requests shown per status bucket
 
 # Constants for request statuses
 REQUEST_STATUSES = {
@@ -39,26 +42,29 @@ def utc_now():
     return datetime.now(timezone.utc)
 
 def get_current_professional():
-    """Get current professional from JWT token"""
-    email = get_jwt_identity()
-    professional = Professional.query.filter_by(email=email).first()
+    """Id, email and active flag of the current professional, without loading its row"""
+    professional = current_account(Professional)
     if not professional:
         raise APIError('Professional not found', 404)
     if not professional.active:
         raise APIError('Account is inactive', 403)
     return professional
 
+def load_current_professional():
+    """The current professional's row, for views that read or change its columns"""
+    return db.session.get(Professional, get_current_professional().id)
+
 def get_verified_professional():
     """Get current professional from JWT token and verify status"""
-    professional = get_current_professional()
+    professional = load_current_professional()
     if not professional.verified:
         raise APIError('Account not verified', 403)
     return professional
 
 @bp.route('', methods=['GET'])
 @error_wrapper
-@cache(timeout=CACHE_TIMEOUT)
 @jwt_required(optional=True)
+@cache(timeout=CACHE_TIMEOUT, tags=['professionals'])
 def get_professionals():
     """Get all professionals with basic filtering"""
     # Get query parameters
@@ -127,7 +133,7 @@ def get_requests():
         
         # Get paginated results
         schema = ServiceRequestSchema(many=True)
-        return paginate_query(query, schema)
+        return paginate_query(query, schema, project=True)
         
     except Exception as e:
         logger.error(f"Error getting requests: {str(e)}")
@@ -142,7 +148,7 @@ def get_requests():
 def accept_request(request_id):
     """Accept a service request"""
     try:
-        professional = get_current_professional()
+        professional = load_current_professional()
         request = get_or_404(ServiceRequest, request_id)
         
         # Validate request status - should be 'assigned' to accept
@@ -176,7 +182,7 @@ def accept_request(request_id):
 def reject_request(request_id):
     """Reject a service request"""
     try:
-        professional = get_current_professional()
+        professional = load_current_professional()
         request = get_or_404(ServiceRequest, request_id)
         
         # Validate request status - should be 'assigned' to reject
@@ -210,7 +216,7 @@ def reject_request(request_id):
 def complete_request(request_id):
     """Complete a service request"""
     try:
-        professional = get_current_professional()
+        professional = load_current_professional()
         request = get_or_404(ServiceRequest, request_id)
         
         # Validate request status - must be 'accepted' to complete
@@ -244,7 +250,7 @@ def complete_request(request_id):
 def update_availability():
     """Update professional's availability"""
     try:
-        professional = get_current_professional()
+        professional = load_current_professional()
         data = request.get_json()
 
         if not isinstance(data.get('available'), bool):
@@ -253,9 +259,6 @@ def update_availability():
         professional.available = data['available']
         db.session.commit()
 
-        # Invalidate cache
-        invalidate_cache('get_professionals')
-
         schema = ProfessionalSchema()
         return schema.dump(professional)
     except APIError as e:
@@ -370,8 +373,7 @@ def verify_document(document_id):
             raise APIError("Invalid document type", 400)
         
         # Get admin user
-        admin_email = get_jwt_identity()
-        admin = Admin.query.filter_by(email=admin_email).first()
+        admin = current_account(Admin)
         if not admin:
             raise APIError("Admin not found", 404)
         
@@ -416,8 +418,8 @@ def verify_document(document_id):
 @user_cache(timeout=CACHE_TIMEOUT)
 def get_profile():
     """Get professional profile"""
-    professional = get_current_professional()
-    schema = ProfessionalSchema()
+    professional = load_current_professional()
+    schema = sparse_schema(ProfessionalSchema())
     return schema.dump(professional)
 
 @bp.route('/profile', methods=['PUT'])
@@ -439,13 +441,52 @@ def update_profile():
             setattr(professional, key, value)
         
         db.session.commit()
-        invalidate_cache('get_profile')
         return ProfessionalSchema().dump(professional)
         
     except Exception as e:
         db.session.rollback()
         raise APIError(str(e), 400)
 
+# Each dashboard section is cached on its own so a change only rebuilds
+# the sections it affects
+@user_memoize(timeout=CACHE_TIMEOUT)
+def dashboard_profile(professional_id):
+    return ProfessionalSchema().dump(db.session.get(Professional, professional_id))
+
+@user_memoize(timeout=CACHE_TIMEOUT, tags=['stats'], stale_ttl=60, early_refresh=1.0)
+def dashboard_stats(professional_id, days):
+    return Statistics.get_professional_stats(professional_id=professional_id, days=days)
+
+# The professional's own tag covers their requests; the rest covers what they embed
+@user_memoize(timeout=CACHE_TIMEOUT, tags=['services', 'users'])
+def dashboard_requests(professional_id):
+    schema = ServiceRequestSchema(many=True)
+    buckets = {}
+    for bucket, statuses in REQUEST_STATUSES.items():
+        if bucket == 'all':
+            continue
+        query = (ServiceRequest.query
+                 .filter(ServiceRequest.professional_id == professional_id,
+                         ServiceRequest.status.in_(statuses))
+                 .order_by(ServiceRequest.request_date.desc(), ServiceRequest.id.desc())
+                 .limit(DASHBOARD_BUCKET_SIZE))
+        buckets[bucket] = fast_dump(schema, eager_load(query, schema).all())
+    return buckets
+
+@bp.route('/dashboard', methods=['GET'])
+@jwt_required()
+@professional_required()
+@error_wrapper
+def get_dashboard():
+    """Get the profile, requests by status bucket and stats in one call"""
+    professional = get_current_professional()
+    days = request.args.get('days', 30, type=int)
+    return {
+        'profile': dashboard_profile(professional.id),
+        'requests': dashboard_requests(professional.id),
+        'stats': dashboard_stats(professional.id, days)
+    }
+
 def init_app(app):
     """Initialize professional blueprint with app"""
     # Register error handlers at application level
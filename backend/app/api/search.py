@@ -3,13 +3,15 @@ from sqlalchemy import or_
 from flask_jwt_extended import jwt_required, get_jwt
 from app.models import Service, Professional, User
 from app.schemas import ServiceSchema, ProfessionalSchema
-from app.cache import cache
+from app.utils.cache import cache
+from app.utils.catalog import service_catalog
+from app.utils.api import paginate_list
 from app.utils.errors import APIError
 
 bp = Blueprint('search', __name__)
 
 @bp.route('/search/services', methods=['GET'])
-@cache(timeout=300)  # Cache for 5 minutes
+@cache(timeout=300, tags=['services'])  # Cache for 5 minutes
 def search_services():
     """Search services with filtering based on name and type"""
     # Get search parameters
@@ -18,42 +20,21 @@ def search_services():
     min_price = request.args.get('min_price', type=float)
     max_price = request.args.get('max_price', type=float)
 
-    # Start with base query
-    query = Service.query
-
-    # Apply text search if provided
-    if search_query:
-        pattern = f"%{search_query}%"
-        query = query.filter(or_(
-            Service.name.ilike(pattern),
-            Service.description.ilike(pattern)
-        ))
-
-    # Filter by service type
-    if service_type:
-        query = query.filter(Service.type == service_type.lower())
-
-    # Apply price filters
-    if min_price is not None:
-        query = query.filter(Service.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Service.price <= max_price)
-
-    # Order by name
-    query = query.order_by(Service.name)
+    services = service_catalog.services(
+        search=search_query,
+        search_fields=('name', 'description'),
+        service_type=service_type,
+        min_price=min_price,
+        max_price=max_price
+    )
 
     # Paginate results
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 10, type=int), 100)
-    pagination = query.paginate(page=page, per_page=per_page)
-
-    # Serialize results
-    schema = ServiceSchema(many=True)
+    pagination = paginate_list(services)
     return {
-        'items': schema.dump(pagination.items),
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'per_page': pagination.per_page
+        'items': pagination['items'],
+        'total': pagination['total'],
+        'pages': pagination['pages'],
+        'per_page': pagination['per_page']
     }
 
 @bp.route('/search/professionals', methods=['GET'])
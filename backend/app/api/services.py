@@ -4,18 +4,19 @@ from ..models import Service, Professional, ServiceRequest, db
 from ..schemas import ServiceSchema, ProfessionalSchema, ServiceRequestSchema
 from ..utils.errors import error_wrapper, APIError, ValidationError
 from ..utils.auth import admin_required, RoleBasedAccess
-from ..utils.api import paginate_query
-from ..utils.cache import cache, invalidate_cache
+from ..utils.api import paginate_query, get_or_404, sparse_schema, batch_ids, batch_response
+from ..utils.cache import cache
+from ..utils.catalog import service_catalog
 import logging
 from functools import wraps
-from sqlalchemy import func
 
 logger = logging.getLogger(__name__)
 bp = Blueprint('services', __name__)
 
 # Constants
 CACHE_TIMEOUT = 300  # 5 minutes
-SERVICE_ENDPOINTS = ['/services', '/services/']
+# A service's detail dumps its requests and the users inside them
+SERVICE_DETAIL_TAGS = ['services', 'requests', 'users', 'professionals']
 
 def validate_service_data(data, partial=False):
     """Validate service data with schema"""
@@ -32,75 +33,40 @@ def validate_service_data(data, partial=False):
         raise ValidationError(errors)
     return schema
 
-def invalidate_service_cache():
-    """Invalidate all service-related cache"""
-    for endpoint in SERVICE_ENDPOINTS:
-        invalidate_cache(endpoint)
-        invalidate_cache(f"{endpoint}/")
-        invalidate_cache(f"{endpoint}?*")
-
-def get_or_404(model_cls, id):
-    """Get model instance by id or return 404"""
-    instance = db.session.get(model_cls, id)
-    if not instance:
-        raise APIError(f"{model_cls.__name__} not found", 404)
-    return instance
-
 @bp.route('/', methods=['GET'])
 @error_wrapper
+@cache(timeout=CACHE_TIMEOUT, tags=['services'], defaults={'sortBy': 'name'})
 def get_services():
     """Get all services with optional filtering"""
     try:
-        query = Service.query
-
-        # Search by name or description
-        search = request.args.get('search')
-        if search:
-            search_term = f"%{search.lower()}%"
-            query = query.filter(
-                db.or_(
-                    func.lower(Service.name).like(search_term),
-                    func.lower(Service.description).like(search_term),
-                    func.lower(Service.type).like(search_term)
-                )
-            )
-
-        # Filter by type if provided
-        service_type = request.args.get('type')
-        if service_type:
-            query = query.filter(func.lower(Service.type) == service_type.lower())
-
-        # Filter by price range
         min_price = request.args.get('minPrice')
         max_price = request.args.get('maxPrice')
-        if min_price:
-            query = query.filter(Service.price >= float(min_price))
-        if max_price:
-            query = query.filter(Service.price <= float(max_price))
-
-        # Sort by different criteria
-        sort_by = request.args.get('sortBy', 'name')
-        if sort_by == 'price_low':
-            query = query.order_by(Service.price.asc())
-        elif sort_by == 'price_high':
-            query = query.order_by(Service.price.desc())
-        else:  # default to name
-            query = query.order_by(Service.name.asc())
-
-        services = query.all()
-        schema = ServiceSchema(many=True)
-        return jsonify(schema.dump(services))
+        return service_catalog.services(
+            search=request.args.get('search'),
+            service_type=request.args.get('type'),
+            min_price=float(min_price) if min_price else None,
+            max_price=float(max_price) if max_price else None,
+            sort_by=request.args.get('sortBy', 'name')
+        )
     except Exception as e:
         logger.error(f"Error fetching services: {str(e)}")
         return jsonify({"error": "Error fetching services"}), 500
 
+@bp.route('/batch', methods=['GET'])
+@error_wrapper
+def get_services_batch():
+    """Get several services by id from the catalog snapshot"""
+    ids = batch_ids()
+    services = {service_id: service_catalog.get(service_id) for service_id in ids}
+    return batch_response(ids, {service_id: service for service_id, service in services.items() if service})
+
 @bp.route('/<int:service_id>/', methods=['GET'])
 @error_wrapper
-@cache(timeout=CACHE_TIMEOUT)
+@cache(timeout=CACHE_TIMEOUT, tags=SERVICE_DETAIL_TAGS)
 def get_service(service_id):
     """Get service details"""
     service = get_or_404(Service, service_id)
-    return ServiceSchema().dump(service)
+    return sparse_schema(ServiceSchema()).dump(service)
 
 @bp.route('/<int:service_id>/professionals/', methods=['GET'])
 @error_wrapper
@@ -131,29 +97,20 @@ def get_service_requests(service_id):
     if status := request.args.get('status'):
         query = query.filter_by(status=status)
     
-    return paginate_query(query, ServiceRequestSchema(many=True))
+    return paginate_query(query, ServiceRequestSchema(many=True), project=True)
 
 @bp.route('/categories/', methods=['GET'])
 @error_wrapper
 @jwt_required()
+@cache(timeout=CACHE_TIMEOUT, tags=['services'])
 def list_service_categories():
     """Get all available service categories"""
     try:
-        categories = db.session.query(Service.type).distinct().all()
-        
-        # Format categories with name and description
-        formatted_categories = {
-            'items': [
-                {
-                    'type': type_name,
-                    'name': type_name.capitalize() + ' Services',
-                    'description': f'Professional {type_name} services for your needs'
-                } for (type_name,) in categories
-            ],
+        categories = service_catalog.categories()
+        return {
+            'items': categories,
             'total': len(categories)
         }
-        
-        return jsonify(formatted_categories)
     except Exception as e:
         logger.error(f"Error fetching service categories: {str(e)}")
         raise APIError("Error fetching service categories", 500)
@@ -172,7 +129,6 @@ def create_service():
         db.session.add(service)
         db.session.commit()
         
-        invalidate_service_cache()
         return schema.dump(service), 201
         
     except Exception as e:
@@ -201,7 +157,6 @@ def update_service(service_id):
         for key, value in update_data.items():
             setattr(service, key, value)
         db.session.commit()
-        invalidate_service_cache()
         
         return ServiceSchema().dump(service)
     except Exception as e:
@@ -224,7 +179,6 @@ def delete_service(service_id):
     
     try:
         service.delete()
-        invalidate_service_cache()
         return '', 204
     except Exception as e:
         db.session.rollback()
@@ -1,41 +1,53 @@
-from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint
+from flask_jwt_extended import jwt_required
 from app.models import Professional, Customer
 from app.utils.auth import admin_required, professional_required, customer_required
+from app.utils.identity import current_account
 from app.utils.stats import Statistics
 from app.utils.errors import APIError
+from app.utils.cache import cache, user_cache
 
 bp = Blueprint('stats', __name__)
 
+CACHE_TIMEOUT = 300
+STALE_TTL = 60  # serve the previous aggregates while one worker recomputes
+
 @bp.route('/stats/admin', methods=['GET'])
 @jwt_required()
 @admin_required()
+@cache(timeout=CACHE_TIMEOUT, tags=['stats'], stale_ttl=STALE_TTL, early_refresh=1.0)
 def admin_stats():
     """Get admin dashboard statistics"""
     service_stats = Statistics.get_service_stats()
     pro_stats = Statistics.get_professional_stats()
     customer_stats = Statistics.get_customer_stats()
     
-    return jsonify({
+    return {
         'services': service_stats,
         'professionals': pro_stats,
         'customers': customer_stats
-    })
+    }
 
 @bp.route('/stats/professional', methods=['GET'])
 @jwt_required()
 @professional_required()
+@user_cache(timeout=CACHE_TIMEOUT, tags=['stats'], stale_ttl=STALE_TTL, early_refresh=1.0)
 def professional_stats():
     """Get professional's personal statistics"""
-    professional = Professional.query.filter_by(email=get_jwt_identity()).first_or_404()
+    professional = current_account(Professional)
+    if not professional:
+        raise APIError('Professional not found', 404)
     stats = Statistics.get_professional_stats(professional_id=professional.id)
-    return jsonify(stats)
+    return stats
 
 @bp.route('/stats/customer', methods=['GET'])
 @jwt_required()
 @customer_required()
+@user_cache(timeout=CACHE_TIMEOUT, tags=['stats'], stale_ttl=STALE_TTL, early_refresh=1.0)
 def customer_stats():
     """Get customer's request statistics"""
-    customer = Customer.query.filter_by(email=get_jwt_identity()).first_or_404()
+    customer = current_account(Customer)
+    if not customer:
+        raise APIError('Customer not found', 404)
     stats = Statistics.get_customer_stats(customer_id=customer.id)
-    return jsonify(stats)
+    return stats
@@ -1,6 +1,7 @@
 from flask import jsonify
 from app.extensions import jwt
-from app.models import User
+from app.utils.identity import load_principal
+from app.utils.blocklist import blocked_users
 
 @jwt.user_identity_loader
 def user_identity_lookup(user_email):
@@ -9,21 +10,46 @@ def user_identity_lookup(user_email):
 
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
-    """Load user from database using JWT identity"""
-    identity = jwt_data["sub"]
-    return User.query.filter_by(email=identity).first()
+    """Resolve the JWT identity to its principal, without a query when cached"""
+    return load_principal(jwt_data["sub"])
 
 @jwt.additional_claims_loader
 def add_claims_to_access_token(identity):
-    """Add user type and admin status to JWT claims"""
-    user = User.query.filter_by(email=identity).first()
-    if user:
+    """Add user id, type and admin status to JWT claims
+
+    Runs for every token created. Claims passed to `create_access_token`
+    take precedence over these, so for login and registration this only
+    costs a principal lookup; tokens minted from just an email get their
+    claims from here.
+    """
+    principal = load_principal(identity)
+    if principal:
+        user_type = principal['type'].lower()
         return {
-            "type": user.type.lower(),
-            "is_admin": user.type.lower() == 'admin'
+            "user_id": principal['id'],
+            "type": user_type,
+            "is_admin": user_type == 'admin'
         }
     return {}
 
+@jwt.token_in_blocklist_loader
+def token_of_blocked_user(jwt_header, jwt_payload):
+    """Reject tokens of blocked users without touching the database"""
+    user_id = jwt_payload.get('user_id')
+    if user_id is None:
+        # Tokens issued before ids were added to the claims
+        principal = load_principal(jwt_payload['sub'])
+        user_id = principal and principal['id']
+    return user_id in blocked_users
+
+@jwt.revoked_token_loader
+def revoked_token_callback(jwt_header, jwt_payload):
+    """Handle token of a blocked user"""
+    return jsonify({
+        'error': 'Account blocked',
+        'message': 'This account has been blocked'
+    }), 401
+
 @jwt.token_verification_failed_loader
 def token_verification_failed_callback(jwt_header, jwt_payload):
     """Handle invalid token"""
@@ -25,6 +25,7 @@ class Config:
     except (ValueError, AttributeError):
         jwt_expires_seconds = 3600
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=jwt_expires_seconds)
+    JWT_VERIFIED_CACHE_SIZE = int(os.environ.get('JWT_VERIFIED_CACHE_SIZE', 4096))  # verified tokens kept per process
     
     # Upload Configuration
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads'))
@@ -33,7 +34,25 @@ class Config:
     
     # Redis config
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/1'
+
+    # Response cache config (per-process tier in front of Redis)
+    CACHE_LOCAL_MAXSIZE = int(os.environ.get('CACHE_LOCAL_MAXSIZE', 1024))
+    CACHE_LOCAL_TIMEOUT = int(os.environ.get('CACHE_LOCAL_TIMEOUT', 30))
+
+    # Response compression (brotli is used when the package is installed)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip, 1-9
+    COMPRESS_BROTLI_LEVEL = int(os.environ.get('COMPRESS_BROTLI_LEVEL', 5))  # 0-11
+    COMPRESS_MIMETYPES = ['application/json', 'text/csv', 'text/plain', 'text/html']
     
+    # Password hashing runs on its own pool; the method is werkzeug's full
+    # "name:params" form, and hashes made with other params are redone on login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))  # waiting hashes before 503
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 2.0))  # seconds, queue + hash
+
     # CORS config
     CORS_HEADERS = 'Content-Type'
 
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from app.extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.passwords import hash_password, verify_password, needs_rehash
 
 db = db  # assuming db is an instance of SQLAlchemy
 
@@ -51,10 +51,13 @@ class User(BaseModel):
     }
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
     
     def block(self):
         """Block a user by setting active to False"""
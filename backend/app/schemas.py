@@ -2,6 +2,10 @@ from marshmallow import fields, validate, pre_load, post_dump
 from .models import User, Customer, Professional, Service, ServiceRequest, ProfessionalDocument, Admin
 from .extensions import db, ma
 
+# Columns that are never part of a response; every user schema marks them
+# load_only, so no dump (lists, exports, batch payloads) includes them
+SECRET_FIELDS = ('password_hash',)
+
 class BaseSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         sqla_session = db.session
@@ -14,7 +18,7 @@ class UserSchema(BaseSchema):
     class Meta(BaseSchema.Meta):
         model = User
         include_fk = True
-        load_only = ('password',)
+        load_only = ('password',) + SECRET_FIELDS
         dump_only = ('created_at', 'updated_at')
     
     id = fields.Integer(dump_only=True)
@@ -31,6 +35,7 @@ class CustomerSchema(BaseSchema):
     class Meta(BaseSchema.Meta):
         model = Customer
         include_fk = True
+        load_only = SECRET_FIELDS
         dump_only = ('created_at', 'updated_at')
     
     id = fields.Integer(dump_only=True)
@@ -75,6 +80,7 @@ class ProfessionalSchema(BaseSchema):
     class Meta(BaseSchema.Meta):
         model = Professional
         include_fk = True
+        load_only = SECRET_FIELDS
         dump_only = ('created_at', 'updated_at', 'status', 'id_proof_path', 'certification_path', 'rating')
     
     id = fields.Integer(dump_only=True)
@@ -130,6 +136,7 @@ class AdminSchema(BaseSchema):
     class Meta(BaseSchema.Meta):
         model = Admin
         include_fk = True
+        load_only = SECRET_FIELDS
     
     id = fields.Integer(dump_only=True)
     user = fields.Nested(UserSchema)
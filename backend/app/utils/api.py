@@ -1,34 +1,437 @@
+from collections import OrderedDict
 from functools import wraps
-from flask import request, jsonify, abort
-from marshmallow import ValidationError
+from datetime import datetime
+import base64
+import binascii
+import csv
+import hashlib
+import io
+import json
+import threading
+from flask import request, jsonify, abort, current_app, stream_with_context
+from marshmallow import ValidationError, fields
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.orm import joinedload, load_only, selectinload
 from ..models import db
 from .errors import APIError
+from .cache import cached, memoize, cached_entities
+from .invalidation import rows_tag
+from .serializers import compile_schema, fast_dump
+
+LOOKUP_TIMEOUT = 30  # seconds hits and misses of key lookups are remembered
+COUNT_ESTIMATE_TIMEOUT = 60  # seconds a filtered count is reused as an estimate
+COUNT_MODES = ('exact', 'estimate', 'none')
+STREAM_FORMATS = ('application/x-ndjson', 'text/csv')
+STREAM_BATCH_SIZE = 1000  # rows fetched per round trip when streaming
+MAX_BATCH_SIZE = 100  # ids accepted by one batch read
+BATCH_TIMEOUT = 300  # seconds a per-entity payload is cached
+BATCH_PAYLOAD_VERSION = 2  # bump when schemas change what a payload holds
+LOADER_OPTIONS_MAXSIZE = 512  # schema configurations whose loader options are kept
+
+_key_lookups = {}
+_loader_options = OrderedDict()  # least recently used first
+_loader_options_lock = threading.Lock()
+
+def _is_nested(field):
+    if isinstance(field, fields.List):
+        field = field.inner
+    return isinstance(field, fields.Nested)
+
+def _nested_schema(field):
+    """Schema dumped by a Nested or List(Nested) field, if any"""
+    if isinstance(field, fields.List):
+        field = field.inner
+    if isinstance(field, fields.Nested):
+        return field.schema
+    return None
+
+def requested_fields(name):
+    """Comma separated values of a query parameter"""
+    return [value.strip() for value in request.args.get(name, '').split(',') if value.strip()]
+
+def sparse_schema(schema):
+    """Copy of a schema limited to the ?fields= and ?include= of the request
+
+    `fields` picks the attributes to dump, dotted for nested ones
+    (`customer.name`); `include` picks nested objects to dump whole. With
+    only `include`, every plain attribute is kept. Without either the schema
+    is returned unchanged.
+    """
+    only, include = requested_fields('fields'), requested_fields('include')
+    if not only and not include:
+        return schema
+    if not only:
+        only = [name for name, field in schema.dump_fields.items() if not _is_nested(field)]
+
+    selected = set(only) | set(include)
+    top_level = {name.split('.', 1)[0] for name in selected}
+    exclude = [name for name in schema.exclude if name.split('.', 1)[0] in top_level]
+    try:
+        return type(schema)(many=schema.many, only=selected, exclude=exclude)
+    except ValueError as e:
+        raise APIError(str(e), 400)
+
+def _projection(schema, model_cls, keep=()):
+    """load_only() columns for a schema limited with `only`, or None"""
+    if schema.only is None:
+        return None
+    mapper = inspect(model_cls)
+    names = {field.attribute or name for name, field in schema.dump_fields.items()}
+    names.update(column.key for column in keep)
+    discriminator = mapper.polymorphic_on
+
+    columns = []
+    for prop in mapper.column_attrs:
+        # Keys, foreign keys and the discriminator are needed to build and relate rows
+        needed = any(column.primary_key or column.foreign_keys or column is discriminator
+                     for column in prop.columns)
+        if needed or prop.key in names:
+            columns.append(getattr(model_cls, prop.key))
+    return columns
+
+def _relationship_loaders(schema, model_cls, parent=None):
+    loaders = []
+    relationships = inspect(model_cls).relationships
+    for name, field in schema.dump_fields.items():
+        relationship = relationships.get(field.attribute or name)
+        nested = _nested_schema(field) if relationship is not None else None
+        if nested is None:
+            continue
+
+        related_cls = relationship.mapper.class_
+        attribute = getattr(model_cls, relationship.key)
+        strategy = selectinload if relationship.uselist else joinedload
+        loader = getattr(parent, strategy.__name__)(attribute) if parent else strategy(attribute)
+        columns = _projection(nested, related_cls)
+        loaders.append(loader.load_only(*columns) if columns else loader)
+        loaders.extend(_relationship_loaders(nested, related_cls, loader))
+    return loaders
+
+def loader_options(schema, model_cls, keep=()):
+    """Loader options for the columns and relationships a schema dumps
+
+    Many-to-one relationships are joined into the main query and collections
+    are loaded with one extra SELECT each, so serializing a page costs the
+    same number of queries however many rows it holds. Schemas limited with
+    `only` also load just the columns they dump, plus the `keep` columns.
+    """
+    key = (type(schema), model_cls, frozenset(schema.only or ()), frozenset(schema.exclude),
+           tuple(column.key for column in keep))
+    with _loader_options_lock:
+        options = _loader_options.get(key)
+        if options is not None:
+            _loader_options.move_to_end(key)
+            return options
+
+    options = _relationship_loaders(schema, model_cls)
+    columns = _projection(schema, model_cls, keep)
+    if columns:
+        options.append(load_only(*columns))
+    # ?fields= makes the set of configurations unbounded, so keep the most
+    # recently used ones only
+    with _loader_options_lock:
+        _loader_options[key] = options
+        while len(_loader_options) > LOADER_OPTIONS_MAXSIZE:
+            _loader_options.popitem(last=False)
+    return options
+
+def eager_load(query, schema, keep=()):
+    """Apply the loader options a schema needs to a query of its model"""
+    model_cls = query.column_descriptions[0]['entity']
+    if model_cls is None:
+        return query
+    options = loader_options(schema, model_cls, keep)
+    return query.options(*options) if options else query
+
+def projected_query(query, schema, keep=()):
+    """Query for just the columns a schema dumps, as lightweight rows
+
+    Returns None when the schema needs full entities: when it dumps a
+    relationship, a dotted attribute, or a model attribute that is not a
+    column (such as a property).
+    """
+    model_cls = query.column_descriptions[0]['entity']
+    if model_cls is None:
+        return None
+    mapper = inspect(model_cls)
+    columns = {prop.key for prop in mapper.column_attrs}
+    names = {field.attribute or name for name, field in schema.dump_fields.items()}
+    for name in names - columns:
+        if '.' in name or name in mapper.relationships or hasattr(model_cls, name):
+            return None
+
+    names.update(column.key for column in keep)
+    selected = [getattr(model_cls, prop.key) for prop in mapper.column_attrs if prop.key in names]
+    return query.with_entities(*selected) if selected else None
+
+def list_query(query, schema, keep=(), project=False):
+    """Query for the rows of a list page
+
+    With `project` the page is read as plain column rows when the schema
+    allows it, skipping the ORM identity map; otherwise entities are loaded
+    with the loader options the schema needs.
+    """
+    if project:
+        projected = projected_query(query, schema, keep)
+        if projected is not None:
+            return projected
+    return eager_load(query, schema, keep)
+
+def encode_cursor(direction, values):
+    """Opaque cursor token for a position in a keyset"""
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps([direction, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token, keyset):
+    """Direction and key values of a cursor token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(raw)
+        if direction not in ('next', 'prev') or len(values) != len(keyset):
+            raise ValueError(token)
+        return direction, [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else value
+            for column, value in zip(keyset, values)
+        ]
+    except (binascii.Error, TypeError, ValueError):
+        raise APIError('Invalid cursor', 400)
+
+def paginate_keyset(query, schema, keyset, descending=True, project=False, **kwargs):
+    """Paginate a query by key values instead of offsets
+
+    `keyset` is a sequence of columns that uniquely orders the rows, e.g.
+    `(ServiceRequest.request_date, ServiceRequest.id)`. Each page seeks past
+    the key of the previous one, so deep pages cost the same as the first.
+    Clients follow the opaque `next_cursor` / `prev_cursor` tokens.
+    """
+    per_page = min(request.args.get('per_page', 10, type=int), 100)
+    if per_page < 1:
+        abort(404)
+
+    token = request.args.get('cursor')
+    direction, values = decode_cursor(token, keyset) if token else ('next', None)
+    backwards = direction == 'prev'
+    newest_first = descending != backwards
+
+    if values is not None:
+        key, position = tuple_(*keyset), tuple_(*values)
+        query = query.filter(key < position if newest_first else key > position)
+    order = [column.desc() if newest_first else column.asc() for column in keyset]
+    rows = list_query(query, schema, keep=keyset, project=project).order_by(None).order_by(*order).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    has_next = values is not None if backwards else has_more
+    has_prev = has_more if backwards else values is not None
+
+    def cursor(direction, row):
+        return encode_cursor(direction, [getattr(row, column.key) for column in keyset])
+
+    return {
+        'items': fast_dump(schema, rows, **kwargs),
+        'per_page': per_page,
+        'has_next': has_next,
+        'has_prev': has_prev,
+        'next_cursor': cursor('next', rows[-1]) if has_next and rows else None,
+        'prev_cursor': cursor('prev', rows[0]) if has_prev and rows else None
+    }
+
+def stream_format():
+    """Streaming format the client asked for in its Accept header, if any"""
+    best = request.accept_mimetypes.best_match(('application/json',) + STREAM_FORMATS)
+    return best if best in STREAM_FORMATS else None
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+def _csv_cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+def stream_query(query, schema, mimetype, project=False):
+    """Stream every row of a query as NDJSON or CSV
+
+    Rows are fetched in batches from a server-side cursor and serialized one
+    at a time, so memory stays flat however large the result is.
+    """
+    dump = compile_schema(schema)
+    rows = list_query(query, schema, project=project).yield_per(STREAM_BATCH_SIZE)
+
+    def generate_ndjson():
+        for row in rows:
+            yield json.dumps(dump(row, many=False), separators=(',', ':')) + '\n'
+
+    def generate_csv():
+        header = [field.data_key or name for name, field in schema.dump_fields.items()]
+        yield _csv_line(header)
+        for row in rows:
+            data = dump(row, many=False)
+            yield _csv_line([_csv_cell(data.get(key)) for key in header])
+
+    generate = generate_csv if mimetype == 'text/csv' else generate_ndjson
+    response = current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+    if mimetype == 'text/csv':
+        filename = request.path.strip('/').replace('/', '-') or 'export'
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+def paginate_query(query, schema, keyset=None, descending=True, project=False, streamable=False, **kwargs):
+    """Paginate a SQLAlchemy query and return serialized results
+
+    Views that pass a `keyset` also accept `?cursor=` and switch to keyset
+    pagination for that request; see `paginate_keyset`. `?fields=` and
+    `?include=` narrow the schema; see `sparse_schema`. `project` reads
+    pages as column rows where possible; see `list_query`. `streamable`
+    views return the whole filtered set instead of a page when the client
+    accepts NDJSON or CSV; see `stream_query`.
+    """
+    schema = sparse_schema(schema)
+    if streamable and (mimetype := stream_format()):
+        return stream_query(query, schema, mimetype, project=project)
+    if keyset is not None and 'cursor' in request.args:
+        return paginate_keyset(query, schema, keyset, descending, project, **kwargs)
 
-def paginate_query(query, schema, **kwargs):
-    """Paginate a SQLAlchemy query and return serialized results"""
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 10, type=int), 100)
+    count = request.args.get('count', 'exact')
+    if count not in COUNT_MODES:
+        raise APIError(f"count must be one of {', '.join(COUNT_MODES)}", 400)
+    if page < 1 or per_page < 1:
+        abort(404)
     
     # Log query before pagination
     print(f"SQL Query before pagination: {query}")
     
-    paginated = query.paginate(page=page, per_page=per_page)
+    # One extra row tells us whether there is a next page without counting
+    items = list_query(query, schema, project=project).limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(items) > per_page
+    items = items[:per_page]
+    if not items and page != 1:
+        abort(404)
+
+    if count == 'exact':
+        total = query.order_by(None).count()
+    elif count == 'estimate':
+        total = estimate_count(query)
+    else:
+        total = None
+    pages = -(-total // per_page) if total is not None else None
     
     # Log pagination results
-    print(f"Pagination results - Total: {paginated.total}, Pages: {paginated.pages}, Items: {len(paginated.items)}")
+    print(f"Pagination results - Total: {total}, Pages: {pages}, Items: {len(items)}")
     
     # Serialize and log items
-    serialized_items = schema.dump(paginated.items, **kwargs)
+    serialized_items = fast_dump(schema, items, **kwargs)
     print(f"Serialized {len(serialized_items)} items")
     
     return {
         'items': serialized_items,
-        'total': paginated.total,
-        'pages': paginated.pages,
+        'total': total,
+        'pages': pages,
         'current_page': page,
         'per_page': per_page,
-        'has_next': paginated.has_next,
-        'has_prev': paginated.has_prev
+        'has_next': has_next,
+        'has_prev': page > 1
+    }
+
+_count_estimates = {}
+
+def estimate_count(query):
+    """Row count of a filtered query, reused for a while per distinct filter
+
+    Counts are cached under the statement and its parameters and dropped
+    when rows of the queried model are inserted or deleted; updates that
+    move rows in or out of a filter are only picked up on expiry.
+    """
+    model_cls = query.column_descriptions[0]['entity']
+    count = _count_estimates.get(model_cls)
+    if count is None:
+        def count_rows(statement_hash, query):
+            return {'total': query.order_by(None).count()}
+        count_rows.__name__ = f"{model_cls.__name__}_count"
+
+        def statement_key(f, statement_hash, query):
+            return f"{f.__name__}:{statement_hash}"
+
+        count = cached(timeout=COUNT_ESTIMATE_TIMEOUT, tags=[rows_tag(model_cls)],
+                       key_func=statement_key)(count_rows)
+        _count_estimates[model_cls] = count
+
+    compiled = query.statement.compile()
+    statement = f"{compiled}|{sorted(compiled.params.items())!r}"
+    return count(hashlib.sha1(statement.encode()).hexdigest(), query)['total']
+
+def paginate_list(items):
+    """Paginate an in-memory list with the same params and shape as paginate_query"""
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 10, type=int), 100)
+    if page < 1 or per_page < 1:
+        abort(404)
+
+    total = len(items)
+    start = (page - 1) * per_page
+    page_items = items[start:start + per_page]
+    if not page_items and page != 1:
+        abort(404)
+
+    pages = -(-total // per_page)
+    return {
+        'items': page_items,
+        'total': total,
+        'pages': pages,
+        'current_page': page,
+        'per_page': per_page,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
+def batch_ids(param='ids'):
+    """Distinct integer ids from a comma separated query parameter, in request order"""
+    raw = request.args.get(param, '')
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw.split(',') if value.strip()))
+    except ValueError:
+        raise APIError(f"'{param}' must be a comma separated list of ids", 400)
+    if not ids:
+        raise APIError(f"'{param}' is required", 400)
+    if len(ids) > MAX_BATCH_SIZE:
+        raise APIError(f"At most {MAX_BATCH_SIZE} ids can be requested at once", 400)
+    return ids
+
+def _schema_label(schema):
+    """Schema class name, plus a digest of its `only` and `exclude` when set"""
+    config = (sorted(schema.only or ()), sorted(schema.exclude))
+    if not any(config):
+        return type(schema).__name__
+    return f"{type(schema).__name__}.{hashlib.sha1(repr(config).encode()).hexdigest()[:8]}"
+
+def load_entities(model_cls, schema, ids, tags=()):
+    """Dumped payloads by id, reading only uncached rows with a single IN query
+
+    Payloads are cached per schema configuration, so schemas limited with
+    `only` or `exclude` never share entries with the full one.
+    """
+    primary_key = inspect(model_cls).primary_key[0]
+
+    def load(missing):
+        rows = eager_load(model_cls.query.filter(primary_key.in_(missing)), schema).all()
+        payloads = fast_dump(schema, rows, many=True)
+        return {getattr(row, primary_key.key): payload for row, payload in zip(rows, payloads)}
+
+    name = f"{model_cls.__tablename__}.{_schema_label(schema)}.v{BATCH_PAYLOAD_VERSION}"
+    return cached_entities(name, ids, load, tags=tags, timeout=BATCH_TIMEOUT)
+
+def batch_response(ids, payloads):
+    """Batch read body: found payloads in request order plus the ids that were not"""
+    return {
+        'items': [payloads[entity_id] for entity_id in ids if entity_id in payloads],
+        'missing': [entity_id for entity_id in ids if entity_id not in payloads]
     }
 
 def validate_schema(schema_cls):
@@ -53,9 +456,44 @@ def validate_schema(schema_cls):
         return wrapper
     return decorator
 
+def lookup_key(model_cls, field, value):
+    """Primary key of the row whose `field` equals `value`, or None
+
+    Hits and misses are both cached for a short while and dropped whenever
+    rows of the model are inserted or deleted, so repeated lookups of rows
+    that do not exist stop reaching the database.
+    """
+    lookup = _key_lookups.get((model_cls, field))
+    if lookup is None:
+        key_attr = getattr(model_cls, inspect(model_cls).primary_key[0].key)
+        column = getattr(model_cls, field)
+
+        def find(value):
+            # Selecting through the entity keeps the inheritance join, so
+            # subclass columns and siblings' rows are handled correctly
+            row = (db.session.query(model_cls).with_entities(key_attr)
+                   .filter(column == value).first())
+            return {'key': row[0] if row else None}
+        find.__name__ = f"{model_cls.__name__}_by_{field}"
+
+        lookup = memoize(timeout=LOOKUP_TIMEOUT, tags=[rows_tag(model_cls)])(find)
+        _key_lookups[(model_cls, field)] = lookup
+    return lookup(value)['key']
+
+def get_by(model_cls, field, value):
+    """Get a model instance by a unique field, or None"""
+    key = lookup_key(model_cls, field, value)
+    if key is None:
+        return None
+    return db.session.get(model_cls, key)
+
 def get_or_404(model_cls, id):
-    """Get a model instance by ID or return 404"""
-    instance = db.session.get(model_cls, id)
+    """Get a model instance by ID or return 404
+
+    Ids are resolved through `lookup_key`, so repeated requests for rows
+    that do not exist are answered without a query.
+    """
+    instance = get_by(model_cls, inspect(model_cls).primary_key[0].key, id)
     if instance is None:
         raise APIError(f"{model_cls.__name__} not found", 404)
     return instance
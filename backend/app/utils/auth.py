@@ -1,43 +1,33 @@
 from functools import wraps
 from flask import jsonify, request, abort
 from flask_jwt_extended import (
-    verify_jwt_in_request, get_jwt_identity, get_jwt,
+    verify_jwt_in_request, get_jwt,
     create_access_token, create_refresh_token
 )
-from ..models import User, Professional, Customer, Admin
+from ..models import User, Professional, Customer, Admin, Service
 from .errors import AuthorizationError
 from ..extensions import db
+from .identity import current_user, current_account
 
 def get_current_user():
     """Get current authenticated user"""
-    user_id = get_jwt_identity()
-    claims = get_jwt()
-    
-    # First try to get from claims
-    user_type = claims.get('type', '').lower()
-    
-    # Then try to get from database
-    if user_type == 'admin':
-        user = Admin.query.get(user_id)
-    elif user_type == 'professional':
-        user = Professional.query.get(user_id)
-    elif user_type == 'customer':
-        user = Customer.query.get(user_id)
-    else:
-        # Fallback to checking all types
-        user = Admin.query.get(user_id)
-        if not user:
-            user = Professional.query.get(user_id) or Customer.query.get(user_id)
-    
-    return user
+    return current_user()
+
+def verified_claims():
+    """Claims of the request's JWT
+
+    Verifying again after `@jwt_required()` is served from the
+    verified-token LRU, so the signature is still checked once.
+    """
+    verify_jwt_in_request()
+    return get_jwt()
 
 def admin_required():
     """Decorator to check if user is admin"""
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt()
+            claims = verified_claims()
             if not claims.get('is_admin'):
                 raise AuthorizationError('Admin access required')
             return fn(*args, **kwargs)
@@ -49,8 +39,7 @@ def professional_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt()
+            claims = verified_claims()
             if claims.get('type', '').lower() != 'professional':
                 raise AuthorizationError('Professional access required')
             return fn(*args, **kwargs)
@@ -62,8 +51,7 @@ def customer_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt()
+            claims = verified_claims()
             if claims.get('type', '').lower() != 'customer':
                 raise AuthorizationError('Customer access required')
             return fn(*args, **kwargs)
@@ -75,8 +63,8 @@ def user_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            user = get_current_user()
+            verified_claims()
+            user = current_account()
             if not user:
                 raise AuthorizationError('Authentication required')
             return fn(*args, **kwargs)
@@ -100,36 +88,34 @@ def generate_tokens(user):
 
 def verify_user_access(model, user_id):
     """Verify user has access to resource"""
-    verify_jwt_in_request()
-    claims = get_jwt()
+    claims = verified_claims()
     
     if claims.get('is_admin'):
         return True
     
     resource = db.session.get(model, user_id)
-    return resource and resource.user_id == get_jwt_identity()
+    account = current_account()
+    return bool(resource and account and resource.user_id == account.id)
 
 class RoleBasedAccess:
     """Role-based access control"""
     @staticmethod
     def can_view_service_requests(service_id):
-        verify_jwt_in_request()
-        claims = get_jwt()
-        user_id = get_jwt_identity()
+        claims = verified_claims()
         
         if claims.get('is_admin'):
             return True
         
         if claims.get('type', '').lower() == 'professional':
-            professional = db.session.get(Professional, user_id)
-            return professional and professional.service_type == service_id
+            professional = current_user(Professional)
+            service = db.session.get(Service, service_id)
+            return bool(professional and service and professional.service_type == service.type)
         
         return False
     
     @staticmethod
     def can_manage_service():
-        verify_jwt_in_request()
-        claims = get_jwt()
+        claims = verified_claims()
         return claims.get('is_admin', False)
     
     @staticmethod
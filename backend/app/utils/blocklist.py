@@ -0,0 +1,93 @@
+"""Blocked users, kept in Redis and mirrored in every worker"""
+import threading
+from sqlalchemy import event, inspect
+from ..extensions import db
+from ..models import User
+from .cache import redis_client, invalidate_cache, current_generation, on_invalidate
+
+BLOCKED_KEY = 'blocked-users'  # Redis set of user ids
+SYNCED_KEY = 'blocked-users:synced'  # set once BLOCKED_KEY was built from the database
+BLOCKED_TAG = 'blocked-users'  # bumped on every change so workers reload
+PENDING_CHANGES = 'blocked_changes'  # key in session.info
+
+class BlockedUsers:
+    """Set of blocked user ids with O(1) membership checks
+
+    Each worker holds a copy of the Redis set. Invalidations of BLOCKED_TAG
+    reach workers over pub/sub and mark the copy stale straight away; a
+    missed message is caught by the generation check, within a second.
+    A Redis that never held the set, or lost it, gets it rebuilt from the
+    users table before it is trusted.
+    """
+    def __init__(self):
+        self._ids = frozenset()
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def ids(self):
+        generation = current_generation(BLOCKED_TAG)
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    if not redis_client.exists(SYNCED_KEY):
+                        self.sync()
+                    self._ids = frozenset(int(member) for member in redis_client.smembers(BLOCKED_KEY))
+                    self._generation = generation
+        return self._ids
+
+    def reset(self):
+        self._generation = None
+
+    def __contains__(self, user_id):
+        return user_id in self.ids()
+
+    def update(self, blocked=(), unblocked=()):
+        """Record users as blocked or unblocked and tell every worker"""
+        pipe = redis_client.pipeline()
+        if blocked:
+            pipe.sadd(BLOCKED_KEY, *blocked)
+        if unblocked:
+            pipe.srem(BLOCKED_KEY, *unblocked)
+        pipe.execute()
+        invalidate_cache(BLOCKED_TAG)
+
+    def sync(self):
+        """Rebuild the Redis set from the users table"""
+        ids = [user_id for user_id, in db.session.query(User.id).filter(User.active.is_(False))]
+        pipe = redis_client.pipeline()
+        pipe.delete(BLOCKED_KEY)
+        if ids:
+            pipe.sadd(BLOCKED_KEY, *ids)
+        pipe.set(SYNCED_KEY, 1)
+        pipe.execute()
+        invalidate_cache(BLOCKED_TAG)
+        return len(ids)
+
+blocked_users = BlockedUsers()
+on_invalidate(BLOCKED_TAG, blocked_users.reset)
+
+@event.listens_for(db.session, 'before_flush')
+def collect_status_changes(session, flush_context, instances):
+    """Remember users whose active flag this transaction changes"""
+    changes = session.info.setdefault(PENDING_CHANGES, {})
+    for user in session.dirty:
+        if isinstance(user, User) and inspect(user).attrs.active.history.has_changes():
+            changes[user.id] = user.active
+
+@event.listens_for(db.session, 'after_commit')
+def publish_status_changes(session):
+    changes = session.info.pop(PENDING_CHANGES, None)
+    if changes:
+        blocked_users.update(blocked=[user_id for user_id, active in changes.items() if not active],
+                             unblocked=[user_id for user_id, active in changes.items() if active])
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_status_changes(session):
+    session.info.pop(PENDING_CHANGES, None)
+
+def init_blocklist(app):
+    """Register the command that rebuilds the blocked set from the database"""
+    @app.cli.command('sync-blocked-users')
+    def sync_blocked_users():
+        """Copy inactive users into the Redis blocked set"""
+        print(f"{blocked_users.sync()} blocked users synced")
@@ -1,65 +1,537 @@
 import redis
-from flask import current_app
+from flask import current_app, request
+from collections import OrderedDict
+import hashlib
 import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
 from functools import wraps
+from urllib.parse import urlencode
+from .metrics import (CACHE_LOOKUPS, CACHE_STORED_BYTES, CACHE_REDIS_SECONDS,
+                      CACHE_RECOMPUTE_SECONDS, CACHE_LOCAL_ENTRIES, CACHE_HIT_RATIO)
+
+logger = logging.getLogger(__name__)
 
 redis_client = redis.Redis.from_url('redis://localhost:6379/0')
 
+KEY_PREFIX = 'cache'
+GENERATION_PREFIX = 'cache-gen'
+LOCK_PREFIX = 'cache-lock'
+INVALIDATION_CHANNEL = 'cache-invalidate'
+DEFAULT_QUERY_ARGS = {'page': '1', 'per_page': '10'}
+LOCK_TIMEOUT = 10  # seconds a recomputation may hold the lock
+LOCK_POLL_INTERVAL = 0.05
+GENERATION_REFRESH = 1  # seconds a worker trusts its copy of a generation
+GENERATION_TTL = 7 * 24 * 3600  # must outlive every cache entry
+GENERATIONS_MAXSIZE = 4096  # tags whose generation a worker remembers
+
+class LocalCache:
+    """Bounded per-process LRU with per-entry expiry and a tag index
+
+    Values are shared with callers, so cached payloads must be treated as
+    read-only.
+    """
+    def __init__(self, maxsize=1024, timeout=30):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags=(), timeout=None):
+        if self.maxsize <= 0:
+            return
+        ttl = min(timeout or self.timeout, self.timeout)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self):
+        return len(self._entries)
+
+local_cache = LocalCache()
+CACHE_LOCAL_ENTRIES.set_function(lambda: len(local_cache))
+_listener = None
+_invalidation_callbacks = {}
+_generations = OrderedDict()  # tag -> (generation, fetched_at), least recently fetched first
+_generations_lock = threading.Lock()
+
+def on_invalidate(tag, callback):
+    """Call `callback` in every worker whenever `tag` is invalidated"""
+    _invalidation_callbacks.setdefault(tag, []).append(callback)
+
+def _invalidate_local(tags):
+    local_cache.invalidate(*tags)
+    for tag in tags:
+        with _generations_lock:
+            _generations.pop(tag, None)
+        for callback in _invalidation_callbacks.get(tag, ()):
+            callback()
+
+def clear_local_cache():
+    """Drop everything this process holds (local entries and generations)"""
+    local_cache.clear()
+    with _generations_lock:
+        _generations.clear()
+
+def _generation_key(tag):
+    return f"{GENERATION_PREFIX}:{tag}"
+
+def tag_generation(tag):
+    """Authoritative generation of a tag, read straight from Redis"""
+    return int(redis_client.get(_generation_key(tag)) or 0)
+
+def _remember_generation(tag, generation, fetched_at):
+    """Keep a tag's generation, forgetting the stalest tags past GENERATIONS_MAXSIZE
+
+    Per-user tags make the set of tags unbounded, but an entry older than
+    GENERATION_REFRESH is re-read anyway, so dropping old ones costs little.
+    """
+    with _generations_lock:
+        _generations[tag] = (generation, fetched_at)
+        _generations.move_to_end(tag)
+        while len(_generations) > GENERATIONS_MAXSIZE:
+            _generations.popitem(last=False)
+
+def _current_generations(tags):
+    """Generation of each tag, read from Redis at most once per refresh window"""
+    now = time.monotonic()
+    generations = {}
+    stale = []
+    for tag in tags:
+        known = _generations.get(tag)
+        if known is not None and now - known[1] < GENERATION_REFRESH:
+            generations[tag] = known[0]
+        else:
+            stale.append(tag)
+
+    if stale:
+        values = redis_client.mget([_generation_key(tag) for tag in stale])
+        for tag, value in zip(stale, values):
+            generations[tag] = int(value or 0)
+            _remember_generation(tag, generations[tag], now)
+    return generations
+
+def current_generation(tag):
+    """Generation of a tag as this worker knows it, refreshed at most once per window"""
+    return _current_generations([tag])[tag]
+
+def init_cache(app):
+    """Size the local tier from config and subscribe to invalidations"""
+    global _listener
+    local_cache.maxsize = app.config.get('CACHE_LOCAL_MAXSIZE', local_cache.maxsize)
+    local_cache.timeout = app.config.get('CACHE_LOCAL_TIMEOUT', local_cache.timeout)
+    if _listener is not None or local_cache.maxsize <= 0:
+        return
+
+    def handle_invalidation(message):
+        _invalidate_local(json.loads(message['data']))
+
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATION_CHANNEL: handle_invalidation})
+        _listener = pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+    except redis.RedisError as e:
+        logger.warning(f"Cache invalidation listener not started: {str(e)}")
+
+LOOKUP_RESULTS = {
+    'local_hit': 'local_hits',
+    'redis_hit': 'redis_hits',
+    'stale_hit': 'stale_hits',
+    'miss': 'misses'
+}
+
+def cache_stats():
+    """Hit counts and hit ratios for each cache tier, across all functions"""
+    stats = dict.fromkeys(LOOKUP_RESULTS.values(), 0)
+    for metric in CACHE_LOOKUPS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith('_total'):
+                stats[LOOKUP_RESULTS[sample.labels['result']]] += int(sample.value)
+
+    lookups = sum(stats.values())
+    redis_lookups = stats['redis_hits'] + stats['stale_hits'] + stats['misses']
+    return {
+        **stats,
+        'local_entries': len(local_cache),
+        'local_hit_ratio': round(stats['local_hits'] / lookups, 4) if lookups else 0,
+        'redis_hit_ratio': round((stats['redis_hits'] + stats['stale_hits']) / redis_lookups, 4) if redis_lookups else 0
+    }
+
+for _tier in ('local', 'redis'):
+    CACHE_HIT_RATIO.labels(_tier).set_function(lambda tier=_tier: cache_stats()[f'{tier}_hit_ratio'])
+
 def cache_key(*args, **kwargs):
     """Generate a cache key from arguments"""
     key_parts = [str(arg) for arg in args]
     key_parts.extend(f"{k}:{v}" for k, v in sorted(kwargs.items()))
     return ":".join(key_parts)
 
-def cache(timeout=300):
-    """Cache decorator for routes"""
+def args_key(f, *args, **kwargs):
+    """Key an entry on the function name and its arguments"""
+    return f"{f.__name__}:{cache_key(*args, **kwargs)}"
+
+def canonical_query(defaults=None):
+    """Query string with params sorted and empty or default values dropped
+
+    Two requests that differ only in parameter order, blank filters or
+    explicitly passed defaults produce the same string.
+    """
+    defaults = {**DEFAULT_QUERY_ARGS, **(defaults or {})}
+    params = sorted(
+        (name, value)
+        for name, values in request.args.lists()
+        for value in values
+        if value != '' and defaults.get(name) != value
+    )
+    return urlencode(params)
+
+def current_role():
+    """Role of the caller from the verified JWT claims, if any"""
+    from flask_jwt_extended import get_jwt
+    try:
+        claims = get_jwt()
+    except RuntimeError:
+        # No JWT was checked for this view
+        return 'anonymous'
+    return (claims.get('type') or 'anonymous').lower()
+
+def route_key(defaults=None):
+    """Key entries on the view, caller role, path and canonical query"""
+    def key_func(f, *args, **kwargs):
+        return f"{f.__name__}:{current_role()}:{request.path}?{canonical_query(defaults)}"
+    return key_func
+
+def user_key(defaults=None):
+    """Key entries on the view, JWT identity, path and canonical query"""
+    def key_func(f, *args, **kwargs):
+        from flask_jwt_extended import get_jwt_identity
+        return f"{f.__name__}:{get_jwt_identity()}:{request.path}?{canonical_query(defaults)}"
+    return key_func
+
+def user_tag(email=None):
+    """Tag shared by every cached entry of a user, the current JWT identity by default"""
+    if email is None:
+        from flask_jwt_extended import get_jwt_identity
+        email = get_jwt_identity()
+    return f"user:{email}"
+
+def _versioned_key(base, entry_tags):
+    """Embed the current generation of every tag in the entry key"""
+    if not entry_tags:
+        return f"{KEY_PREFIX}:{base}"
+    generations = _current_generations(entry_tags)
+    return f"{KEY_PREFIX}:{base}@" + ".".join(str(generations[tag]) for tag in entry_tags)
+
+def _is_cacheable(data):
+    """Only plain JSON payloads are stored; responses and tuples pass through"""
+    return isinstance(data, (dict, list))
+
+def _load(key):
+    """Read a cache entry hash from Redis"""
+    entry = redis_client.hgetall(key)
+    if not entry:
+        return None
+    return {
+        'body': entry[b'body'],
+        'etag': entry[b'etag'].decode(),
+        'expires': float(entry[b'expires']),
+        'delta': float(entry[b'delta'])
+    }
+
+def _store(key, body, etag, timeout, stale_ttl, delta):
+    """Write a cache entry hash"""
+    pipe = redis_client.pipeline()
+    pipe.hset(key, mapping={
+        'body': body,
+        'etag': etag,
+        'expires': time.time() + timeout,
+        'delta': delta
+    })
+    pipe.expire(key, timeout + stale_ttl)
+    pipe.execute()
+
+def _serialize(data, as_response):
+    """Encode a payload to the exact bytes sent to clients"""
+    if as_response:
+        return current_app.json.response(data).get_data()
+    return json.dumps(data).encode('utf-8')
+
+def _etag(body):
+    return hashlib.sha1(body).hexdigest()
+
+def _json_response(body, etag):
+    """Build a JSON response from cached bytes, answering 304 when possible"""
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def _is_fresh(entry, early_refresh):
+    """Check expiry, optionally refreshing early (probabilistic XFetch)
+
+    With `early_refresh` set, an entry is treated as expired slightly before
+    its deadline with a probability that grows as the deadline approaches and
+    with how long the value took to compute, so concurrent workers spread
+    their refreshes out instead of all recomputing at expiry.
+    """
+    now = time.time()
+    if early_refresh and entry['delta']:
+        now -= entry['delta'] * early_refresh * math.log(1.0 - random.random())
+    return now < entry['expires']
+
+# Delete a lock only if it still holds our token, so an expired lock that
+# another caller has since taken is left alone
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_release_lock_script = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+
+def _acquire_lock(lock_key, lock_timeout):
+    """Take the recompute lock, returning its token or None if it is held"""
+    token = uuid.uuid4().hex
+    if redis_client.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)):
+        return token
+    return None
+
+def _release_lock(lock_key, token):
+    _release_lock_script(keys=[lock_key], args=[token])
+
+def _wait_for(key, lock_key, lock_timeout):
+    """Wait for the worker holding the lock to publish a fresh entry"""
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = _load(key)
+        if entry is not None or not redis_client.exists(lock_key):
+            return entry
+    return None
+
+def cached(timeout=300, tags=(), key_func=args_key, stale_ttl=0, early_refresh=0,
+           lock_timeout=LOCK_TIMEOUT, as_response=False):
+    """Cache the result of a function under a key and a set of tags
+
+    `tags` may be a sequence of strings or a callable returning one from the
+    call's arguments, which lets request- or argument-dependent tags (e.g. the
+    current user) be resolved lazily.
+    Keys embed the current generation of each tag, so `invalidate_cache`
+    only has to bump the generation; entries under the old generation are
+    never read again and simply expire. Hits are served from the per-process
+    tier first and from Redis second.
+
+    Entries hold the serialized JSON and its content hash. With `as_response`
+    hits are written to the client as-is with an ETag, and a matching
+    If-None-Match gets a 304; otherwise the decoded data is returned.
+
+    Setting `stale_ttl` or `early_refresh` makes recomputation single-flight:
+    one caller takes a short Redis lock and recomputes while the others are
+    served the previous value, which is kept for `stale_ttl` seconds past its
+    expiry. `early_refresh` is the XFetch beta (1.0 is a good default).
+    """
+    single_flight = bool(stale_ttl or early_refresh)
+
+    def decode(entry):
+        if as_response:
+            return entry['body'], entry['etag']
+        return json.loads(entry['body'])
+
+    def output(payload):
+        if as_response:
+            return _json_response(*payload)
+        return payload
+
     def decorator(f):
+        name = f"{f.__module__}.{f.__name__}"
+        lookups = {result: CACHE_LOOKUPS.labels(name, result) for result in LOOKUP_RESULTS}
+        redis_get = CACHE_REDIS_SECONDS.labels(name, 'get')
+        redis_set = CACHE_REDIS_SECONDS.labels(name, 'set')
+        redis_generations = CACHE_REDIS_SECONDS.labels(name, 'generations')
+
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            key = f"{f.__name__}:{cache_key(*args, **kwargs)}"
-            
-            # Try to get from cache
-            cached = redis_client.get(key)
-            if cached:
-                return json.loads(cached)
-            
+            entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+            with redis_generations.time():
+                key = _versioned_key(key_func(f, *args, **kwargs), entry_tags)
+
+            # Try the local tier, then Redis
+            payload = local_cache.get(key)
+            if payload is not None:
+                lookups['local_hit'].inc()
+                return output(payload)
+
+            with redis_get.time():
+                entry = _load(key)
+            if entry is not None and _is_fresh(entry, early_refresh):
+                lookups['redis_hit'].inc()
+                payload = decode(entry)
+                local_cache.set(key, payload, entry_tags, timeout)
+                return output(payload)
+
+            # Let a single caller recompute; everyone else gets the stale value
+            lock_key = f"{LOCK_PREFIX}:{key}"
+            lock_token = _acquire_lock(lock_key, lock_timeout) if single_flight else None
+            if single_flight and lock_token is None:
+                if entry is None:
+                    entry = _wait_for(key, lock_key, lock_timeout)
+                if entry is not None:
+                    lookups['stale_hit'].inc()
+                    return output(decode(entry))
+
             # Get fresh data
-            data = f(*args, **kwargs)
-            
-            # Cache the data
-            redis_client.setex(key, timeout, json.dumps(data))
-            
-            return data
+            lookups['miss'].inc()
+            try:
+                started = time.monotonic()
+                data = f(*args, **kwargs)
+                elapsed = time.monotonic() - started
+                CACHE_RECOMPUTE_SECONDS.labels(name).observe(elapsed)
+                if not _is_cacheable(data):
+                    return data
+
+                # Store the encoded data in both tiers and index it under each tag
+                body = _serialize(data, as_response)
+                etag = _etag(body)
+                payload = (body, etag) if as_response else data
+                local_cache.set(key, payload, entry_tags, timeout)
+                with redis_set.time():
+                    _store(key, body, etag, timeout, stale_ttl, elapsed)
+                CACHE_STORED_BYTES.labels(name).inc(len(body))
+                return output(payload)
+            finally:
+                if lock_token is not None:
+                    _release_lock(lock_key, lock_token)
         return decorated_function
     return decorator
 
-def user_cache(timeout=300):
+def cache(timeout=300, tags=(), defaults=None, **options):
+    """Cache decorator for routes, serving hits as JSON responses with an ETag
+
+    Entries are shared by every caller with the same role; `defaults` lists
+    query params whose default value should not split the cache.
+    """
+    return cached(timeout=timeout, tags=tags, key_func=route_key(defaults), as_response=True, **options)
+
+def user_cache(timeout=300, tags=(), defaults=None, **options):
     """Cache decorator for user-specific routes"""
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            from flask_jwt_extended import get_jwt_identity
-            
-            # Include user identity in cache key
-            user_id = get_jwt_identity()
-            key = f"{f.__name__}:{user_id}:{cache_key(*args, **kwargs)}"
-            
-            # Try to get from cache
-            cached = redis_client.get(key)
-            if cached:
-                return json.loads(cached)
-            
-            # Get fresh data
-            data = f(*args, **kwargs)
-            
-            # Cache the data
-            redis_client.setex(key, timeout, json.dumps(data))
-            
-            return data
-        return decorated_function
-    return decorator
+    def entry_tags(*args, **kwargs):
+        return [user_tag(), *tags]
+    return cached(timeout=timeout, tags=entry_tags, key_func=user_key(defaults), as_response=True, **options)
+
+def memoize(timeout=300, tags=()):
+    """Memoization decorator for plain functions"""
+    return cached(timeout=timeout, tags=tags, key_func=args_key)
+
+def user_memoize(timeout=300, tags=(), **options):
+    """Memoization for functions whose result belongs to the current user"""
+    def entry_tags(*args, **kwargs):
+        return [user_tag(), *tags]
+    return cached(timeout=timeout, tags=entry_tags, key_func=args_key, **options)
+
+def cached_entities(name, ids, load, tags=(), timeout=300):
+    """Per-entity payloads for many ids, loading only the ones not cached
+
+    Each payload is cached on its own under `name` and `tags`, so batch and
+    single-item reads share entries. `load(ids)` must return a dict of id to
+    payload for the ids it finds, ideally from one `IN (...)` query. Returns
+    a dict with an entry for every id that exists.
+    """
+    label = f"entities.{name}"
+    lookups = {result: CACHE_LOOKUPS.labels(label, result) for result in LOOKUP_RESULTS}
+    keys = {entity_id: _versioned_key(f"{name}:{entity_id}", tags) for entity_id in ids}
+
+    found = {}
+    for entity_id, key in keys.items():
+        payload = local_cache.get(key)
+        if payload is not None:
+            lookups['local_hit'].inc()
+            found[entity_id] = payload
+
+    remote = [entity_id for entity_id in ids if entity_id not in found]
+    if remote:
+        with CACHE_REDIS_SECONDS.labels(label, 'get').time():
+            bodies = redis_client.mget([keys[entity_id] for entity_id in remote])
+        for entity_id, body in zip(remote, bodies):
+            if body is not None:
+                lookups['redis_hit'].inc()
+                found[entity_id] = json.loads(body)
+                local_cache.set(keys[entity_id], found[entity_id], tags, timeout)
+
+    missing = [entity_id for entity_id in ids if entity_id not in found]
+    if missing:
+        lookups['miss'].inc(len(missing))
+        loaded = load(missing)
+        pipe = redis_client.pipeline()
+        for entity_id, payload in loaded.items():
+            body = _serialize(payload, False)
+            pipe.set(keys[entity_id], body, ex=timeout)
+            local_cache.set(keys[entity_id], payload, tags, timeout)
+            CACHE_STORED_BYTES.labels(label).inc(len(body))
+        with CACHE_REDIS_SECONDS.labels(label, 'set').time():
+            pipe.execute()
+        found.update(loaded)
+    return found
+
+def invalidate_cache(*tags):
+    """Invalidate every cache entry carrying any of the given tags
+
+    Bumps each tag's generation and announces it in one pipelined call; no
+    keys are scanned or deleted. Other workers drop their local copies when
+    the invalidation message arrives on the pub/sub channel.
+    """
+    if not tags:
+        return
+    with CACHE_REDIS_SECONDS.labels('invalidate_cache', 'invalidate').time():
+        pipe = redis_client.pipeline()
+        for tag in tags:
+            pipe.incr(_generation_key(tag))
+            pipe.expire(_generation_key(tag), GENERATION_TTL)
+        pipe.publish(INVALIDATION_CHANNEL, json.dumps(tags))
+        results = pipe.execute()
 
-def invalidate_cache(pattern):
-    """Invalidate cache keys matching pattern"""
-    for key in redis_client.scan_iter(pattern):
-        redis_client.delete(key)
+    _invalidate_local(tags)
+    now = time.monotonic()
+    for tag, generation in zip(tags, results[0:-1:2]):
+        _remember_generation(tag, generation, now)
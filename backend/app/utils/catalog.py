@@ -0,0 +1,125 @@
+"""In-memory service catalog shared by every service listing endpoint"""
+from bisect import bisect_left, bisect_right
+import threading
+import time
+from ..models import Service
+from ..schemas import services_list_schema
+from .cache import tag_generation, on_invalidate
+from .metrics import CATALOG_REBUILD_SECONDS
+
+CACHE_TAG = 'services'
+VERSION_CHECK_INTERVAL = 5  # seconds between Redis version checks
+SEARCH_FIELDS = ('name', 'description', 'type')
+
+class CatalogSnapshot:
+    """Immutable view of the services table with precomputed indexes"""
+    def __init__(self, version, services):
+        self.version = version
+        self.index = {s['id']: s for s in services}
+        self.by_id = sorted(services, key=lambda s: s['id'])
+        self.by_name = sorted(services, key=lambda s: s['name'])
+        self.by_price = sorted(services, key=lambda s: s['price'])
+        self.prices = [s['price'] for s in self.by_price]
+
+        self.by_type = {}
+        for service in self.by_name:
+            self.by_type.setdefault(service['type'], []).append(service)
+
+        self.categories = [
+            {
+                'type': type_name,
+                'name': type_name.capitalize() + ' Services',
+                'description': f'Professional {type_name} services for your needs'
+            } for type_name in sorted(self.by_type)
+        ]
+
+    def price_range(self, min_price=None, max_price=None):
+        """Services within a price range, cheapest first"""
+        start = 0 if min_price is None else bisect_left(self.prices, min_price)
+        end = len(self.prices) if max_price is None else bisect_right(self.prices, max_price)
+        return self.by_price[start:end]
+
+class ServiceCatalog:
+    """Per-worker catalog snapshot, rebuilt when the services table changes
+
+    The snapshot version is the generation of the `services` cache tag, so
+    any invalidation of that tag makes it stale. Workers re-check the version
+    as soon as the invalidation arrives over pub/sub, and every few seconds
+    in case a message is missed.
+    """
+    def __init__(self):
+        self._snapshot = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """Current snapshot, rebuilt from the database if it is out of date"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return snapshot
+
+        with self._lock:
+            version = tag_generation(CACHE_TAG)
+            if self._snapshot is None or self._snapshot.version != version:
+                with CATALOG_REBUILD_SECONDS.time():
+                    # Only the services' own columns: the snapshot is versioned on the
+                    # services tag alone, so nested requests and professionals would go stale
+                    services = services_list_schema.dump(Service.query.all())
+                    self._snapshot = CatalogSnapshot(version, services)
+            self._checked_at = now
+            return self._snapshot
+
+    def invalidate(self):
+        """Force a version check on the next access"""
+        self._checked_at = 0
+
+    def clear(self):
+        self._snapshot = None
+        self._checked_at = 0
+
+    def get(self, service_id):
+        """Look up a single service by id"""
+        return self.snapshot().index.get(service_id)
+
+    def categories(self):
+        """Distinct service types formatted as categories"""
+        return self.snapshot().categories
+
+    def services(self, search=None, search_fields=SEARCH_FIELDS, service_type=None,
+                 min_price=None, max_price=None, sort_by='name'):
+        """Filter and sort services without touching the database
+
+        `sort_by` is one of 'name', 'price_low', 'price_high' or 'id'.
+        """
+        snapshot = self.snapshot()
+        service_type = service_type.lower() if service_type else None
+
+        if sort_by in ('price_low', 'price_high'):
+            items = snapshot.price_range(min_price, max_price)
+            if service_type:
+                items = [s for s in items if s['type'] == service_type]
+            if sort_by == 'price_high':
+                items = items[::-1]
+        else:
+            if service_type:
+                items = snapshot.by_type.get(service_type, [])
+                if sort_by == 'id':
+                    items = sorted(items, key=lambda s: s['id'])
+            else:
+                items = snapshot.by_id if sort_by == 'id' else snapshot.by_name
+            if min_price is not None:
+                items = [s for s in items if s['price'] >= min_price]
+            if max_price is not None:
+                items = [s for s in items if s['price'] <= max_price]
+
+        if search:
+            term = search.lower()
+            items = [
+                s for s in items
+                if any(term in (s.get(field) or '').lower() for field in search_fields)
+            ]
+        return list(items)
+
+service_catalog = ServiceCatalog()
+on_invalidate(CACHE_TAG, service_catalog.invalidate)
@@ -0,0 +1,79 @@
+"""Compress responses with brotli or gzip depending on what the client accepts"""
+from functools import wraps
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+NO_BODY_STATUSES = (204, 304)
+
+def compress(level=None, enabled=True):
+    """Override the compression level of a view, or turn compression off
+
+    The level applies to whichever encoding is negotiated (gzip 1-9,
+    brotli 0-11).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            return f(*args, **kwargs)
+        decorated_function.compress_level = level
+        decorated_function.compress_enabled = enabled
+        return decorated_function
+    return decorator
+
+def _view_options():
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'compress_enabled', True), getattr(view, 'compress_level', None)
+
+def choose_encoding(accept_encodings):
+    """Best encoding supported by both sides, or None"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+def _should_compress(response, config):
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if response.status_code < 200 or response.status_code in NO_BODY_STATUSES:
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    if response.mimetype not in config['COMPRESS_MIMETYPES']:
+        return False
+    return (response.content_length or 0) >= config['COMPRESS_MIN_SIZE']
+
+def compress_response(response):
+    """after_request hook compressing eligible responses"""
+    config = current_app.config
+    if not config['COMPRESS_ENABLED'] or not _should_compress(response, config):
+        return response
+
+    enabled, level = _view_options()
+    if not enabled:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if encoding == 'br':
+        data = brotli.compress(body, quality=level if level is not None else config['COMPRESS_BROTLI_LEVEL'])
+    else:
+        data = gzip.compress(body, compresslevel=level if level is not None else config['COMPRESS_LEVEL'], mtime=0)
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # The encoded bytes differ from the identity representation
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    """Register the compression hook on an app"""
+    app.after_request(compress_response)
@@ -0,0 +1,91 @@
+"""Resolve the authenticated user once per request"""
+from collections import namedtuple
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from ..extensions import db
+from ..models import User, Customer, Professional, Admin
+from .cache import cached, args_key, user_tag
+
+PRINCIPAL_TIMEOUT = 60  # seconds a resolved identity is shared between workers
+
+USER_MODELS = {
+    'customer': Customer,
+    'professional': Professional,
+    'admin': Admin
+}
+
+# What views learn about the current user without loading its row
+Account = namedtuple('Account', ('id', 'email', 'type', 'active'))
+
+@cached(timeout=PRINCIPAL_TIMEOUT, tags=lambda email: [user_tag(email)], key_func=args_key)
+def _principal(email):
+    row = db.session.query(User.id, User.type, User.active).filter(User.email == email).first()
+    if row is None:
+        return {'principal': None}
+    return {'principal': {'id': row.id, 'email': email, 'type': row.type, 'active': row.active}}
+
+def load_principal(email):
+    """Id, type and active flag of the user with an email, or None
+
+    Resolved at most once per request and otherwise served from the shared
+    cache, which drops the entry whenever the user is committed (profile
+    updates, block, unblock).
+    """
+    principals = g.setdefault('principals', {})
+    if email not in principals:
+        principals[email] = _principal(email)['principal']
+    return principals[email]
+
+def current_principal():
+    """Principal of the current JWT identity, or None"""
+    return load_principal(get_jwt_identity())
+
+def current_account(model_cls=User):
+    """The current user's principal as an `Account`, or None if it is not a `model_cls`
+
+    Enough for ownership and status checks; views that read or change other
+    columns load the row with `current_user`.
+    """
+    principal = current_principal()
+    if principal is None or not issubclass(USER_MODELS.get(principal['type'], User), model_cls):
+        return None
+    return Account(**principal)
+
+def token_claims(user):
+    """Claims identifying a user without a lookup by email"""
+    user_type = user.type.lower()
+    return {
+        'user_id': user.id,
+        'type': user_type,
+        'is_admin': user_type == 'admin'
+    }
+
+def current_user_ref():
+    """(model class, id) of the current user, or None
+
+    Read from the token claims when it carries them; tokens issued before
+    the id was added are resolved through their principal.
+    """
+    claims = get_jwt()
+    if 'user_id' in claims:
+        return USER_MODELS.get(claims.get('type'), User), claims['user_id']
+    principal = current_principal()
+    if principal is None:
+        return None
+    return USER_MODELS.get(principal['type'], User), principal['id']
+
+def current_user(model_cls=User):
+    """The current user loaded from its own subtype table, or None if it is not a `model_cls`"""
+    ref = current_user_ref()
+    if ref is None or not issubclass(ref[0], model_cls):
+        return None
+    return db.session.get(*ref)
+
+def _forget_principals(exc=None):
+    g.pop('principals', None)
+
+def init_identity(app):
+    """Keep resolved principals to the request they were resolved in"""
+    # An app context (and its `g`) can outlive a request, e.g. in the CLI or tests
+    app.before_request(_forget_principals)
+    app.teardown_request(_forget_principals)
@@ -0,0 +1,95 @@
+"""Invalidate cache tags automatically when model changes are committed"""
+from sqlalchemy import event, inspect
+from ..extensions import db
+from ..models import User, Professional, Service, ServiceRequest, ProfessionalDocument
+from .cache import invalidate_cache, user_tag
+
+PENDING_TAGS = 'cache_tags'  # key in session.info
+
+def rows_tag(model_cls):
+    """Tag bumped whenever rows of a model are inserted or deleted"""
+    return f"rows:{model_cls.__tablename__}"
+
+def _rows_tags(instance):
+    """Rows tags for the model of an instance and every model it inherits from"""
+    return {rows_tag(mapper.class_) for mapper in inspect(instance).mapper.iterate_to_root()}
+
+def _user_tags(user):
+    """Per-user tags for a user, including any email it is being renamed from"""
+    emails = {user.email, *inspect(user).attrs.email.history.deleted}
+    return {user_tag(email) for email in emails if email}
+
+def _owner_tags(instance, *foreign_keys):
+    """Per-user tags for the users an instance points at, before and after the change"""
+    state = inspect(instance)
+    user_ids = set()
+    for name in foreign_keys:
+        history = state.attrs[name].history
+        user_ids.update(history.added, history.unchanged, history.deleted)
+
+    tags = set()
+    for user_id in user_ids - {None}:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            tags |= _user_tags(user)
+    return tags
+
+def _tags_for_user(user, created_or_deleted):
+    tags = _user_tags(user) | {'users'}
+    if inspect(user).attrs.email.history.deleted:
+        # Lookups by the old email must miss
+        tags |= _rows_tags(user)
+    if isinstance(user, Professional):
+        tags.add('professionals')
+    if created_or_deleted:
+        tags.add('stats')
+    return tags
+
+def _tags_for_service(service, created_or_deleted):
+    return {'services', 'stats'}
+
+def _tags_for_request(service_request, created_or_deleted):
+    return {'requests', 'stats'} | _owner_tags(service_request, 'customer_id', 'professional_id')
+
+def _tags_for_document(document, created_or_deleted):
+    return _owner_tags(document, 'professional_id')
+
+# Customer, Professional and Admin all match User
+TAG_RULES = (
+    (User, _tags_for_user),
+    (Service, _tags_for_service),
+    (ServiceRequest, _tags_for_request),
+    (ProfessionalDocument, _tags_for_document),
+)
+
+def tags_for(instance, created_or_deleted=False):
+    """Cache tags made stale by a change to a model instance"""
+    tags = _rows_tags(instance) if created_or_deleted else set()
+    for model, rule in TAG_RULES:
+        if isinstance(instance, model):
+            return tags | rule(instance, created_or_deleted)
+    return tags
+
+@event.listens_for(db.session, 'before_flush')
+def collect_tags(session, flush_context, instances):
+    """Record the tags touched by this flush until the transaction ends"""
+    pending = session.info.setdefault(PENDING_TAGS, set())
+    with session.no_autoflush:
+        for instance in session.new:
+            pending |= tags_for(instance, created_or_deleted=True)
+        for instance in session.deleted:
+            pending |= tags_for(instance, created_or_deleted=True)
+        for instance in session.dirty:
+            if session.is_modified(instance, include_collections=False):
+                pending |= tags_for(instance)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_committed(session):
+    """Invalidate everything the transaction touched in one round trip"""
+    tags = session.info.pop(PENDING_TAGS, None)
+    if tags:
+        invalidate_cache(*sorted(tags))
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_tags(session):
+    session.info.pop(PENDING_TAGS, None)
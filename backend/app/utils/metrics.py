@@ -0,0 +1,39 @@
+"""Prometheus metrics for the cache layers"""
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+# Kept apart from the default registry so the scrape only carries app metrics
+registry = CollectorRegistry()
+
+CACHE_LOOKUPS = Counter(
+    'cache_lookups', 'Cache lookups by decorated function and outcome',
+    ['function', 'result'], registry=registry
+)
+CACHE_STORED_BYTES = Counter(
+    'cache_stored_bytes', 'Bytes written to Redis by decorated function',
+    ['function'], registry=registry
+)
+CACHE_REDIS_SECONDS = Histogram(
+    'cache_redis_seconds', 'Latency of cache round trips to Redis',
+    ['function', 'operation'], registry=registry,
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25)
+)
+CACHE_RECOMPUTE_SECONDS = Histogram(
+    'cache_recompute_seconds', 'Time spent recomputing a value on a cache miss',
+    ['function'], registry=registry
+)
+CACHE_LOCAL_ENTRIES = Gauge(
+    'cache_local_entries', 'Entries held in the per-process cache tier',
+    registry=registry
+)
+CACHE_HIT_RATIO = Gauge(
+    'cache_hit_ratio', 'Share of lookups answered by a cache tier, across all functions',
+    ['tier'], registry=registry
+)
+CATALOG_REBUILD_SECONDS = Histogram(
+    'catalog_rebuild_seconds', 'Time spent rebuilding the service catalog snapshot',
+    registry=registry
+)
+
+def render():
+    """Metrics in the Prometheus text exposition format"""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
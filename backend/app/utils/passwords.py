@@ -0,0 +1,74 @@
+"""Password hashing on a bounded worker pool, off the request threads"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+from .errors import APIError
+
+# Used outside an app context; mirrors the defaults in Config
+DEFAULTS = {
+    'PASSWORD_HASH_METHOD': 'scrypt:32768:8:1',
+    'PASSWORD_HASH_WORKERS': max(1, (os.cpu_count() or 2) // 2),
+    'PASSWORD_HASH_QUEUE': 16,
+    'PASSWORD_HASH_TIMEOUT': 2.0,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+class HashingOverloaded(APIError):
+    """The hashing pool is full or missed its latency budget"""
+    def __init__(self):
+        super().__init__('Too many sign-in attempts, please retry shortly', 503)
+
+def _setting(name):
+    if has_app_context():
+        return current_app.config.get(name, DEFAULTS[name])
+    return DEFAULTS[name]
+
+class _Pool:
+    """Executor with a cap on the work it holds, running or queued"""
+    def __init__(self, workers, capacity):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(workers + capacity)
+
+    def run(self, fn, *args, timeout):
+        if not self.slots.acquire(blocking=False):
+            raise HashingOverloaded()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()  # only succeeds while still queued
+            raise HashingOverloaded()
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _Pool(_setting('PASSWORD_HASH_WORKERS'), _setting('PASSWORD_HASH_QUEUE'))
+    return _pool
+
+def _run(fn, *args):
+    # hashlib's scrypt and pbkdf2 release the GIL, so the pool's threads hash
+    # in parallel while request threads keep serving
+    return _get_pool().run(fn, *args, timeout=_setting('PASSWORD_HASH_TIMEOUT'))
+
+def hash_password(password):
+    """Hash a password with the configured method"""
+    return _run(generate_password_hash, password, _setting('PASSWORD_HASH_METHOD'))
+
+def verify_password(password_hash, password):
+    """Check a password against its hash"""
+    return _run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """Whether a hash was made with other parameters than the configured method"""
+    return password_hash.split('$', 1)[0] != _setting('PASSWORD_HASH_METHOD')
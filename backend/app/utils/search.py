@@ -1,32 +1,8 @@
 from sqlalchemy import or_, and_, func
 from sqlalchemy.orm import aliased
 from ..models import User, Professional, Service, ServiceRequest, Customer
-from ..extensions import redis_client, db
-from functools import wraps
-import json
-
-def memoize(timeout=300):
-    """Memoization decorator using Redis cache"""
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            # Create a unique cache key based on function name and arguments
-            key = f"memoize:{f.__name__}:{str(args)}:{str(kwargs)}"
-            
-            # Try to get cached result
-            cached = redis_client.get(key)
-            if cached:
-                return json.loads(cached)
-            
-            # Get fresh result
-            result = f(*args, **kwargs)
-            
-            # Cache the result
-            redis_client.setex(key, timeout, json.dumps(result))
-            
-            return result
-        return decorated_function
-    return decorator
+from ..extensions import db
+from .cache import memoize
 
 class Search:
     @staticmethod
@@ -82,7 +58,7 @@ class Search:
             return default
 
     @staticmethod
-    @memoize(timeout=300)
+    @memoize(timeout=300, tags=['services'])
     def search_services(query=None, **filters):
         """Search services with caching"""
         base_query = Service.query
@@ -109,7 +85,7 @@ class Search:
         } for s in results]
     
     @staticmethod
-    @memoize(timeout=300)
+    @memoize(timeout=300, tags=['professionals'])
     def search_professionals(query=None, **filters):
         """Search professionals with caching"""
         # Use aliased to prevent ambiguous column names
@@ -182,7 +158,7 @@ class Search:
         ).limit(limit).all()
     
     @staticmethod
-    @memoize(timeout=300)
+    @memoize(timeout=300, tags=['requests'])
     def search_service_requests(**filters):
         """Search service requests with filters"""
         query = ServiceRequest.query
@@ -0,0 +1,170 @@
+"""Precompiled serializers that produce the same output as `Schema.dump`"""
+import threading
+from collections import OrderedDict
+from marshmallow import Schema, fields, missing, utils
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+
+COMPILED_MAXSIZE = 512  # schema configurations whose serializer is kept
+
+_compiled = OrderedDict()  # least recently used first
+_lock = threading.Lock()
+
+def _config_key(schema):
+    return (type(schema), frozenset(schema.only or ()), frozenset(schema.exclude), schema.many)
+
+def _getter(attribute):
+    """Attribute access equivalent to marshmallow's default `get_value`"""
+    if '.' in attribute:
+        return lambda obj: utils.get_value(obj, attribute, missing)
+
+    def get(obj):
+        if type(obj) is dict:
+            return obj.get(attribute, missing)
+        return getattr(obj, attribute, missing)
+    return get
+
+def _formatter(field, name):
+    """Function turning an attribute value into its dumped form"""
+    kind = type(field)
+    fallback = field._serialize
+
+    if kind is fields.Integer and not field.as_string:
+        return lambda value, obj: None if value is None else int(value)
+    if kind is fields.Float and not field.as_string:
+        return lambda value, obj: None if value is None else float(value)
+    if kind in (fields.String, fields.Email):
+        return lambda value, obj: value if value is None or type(value) is str else fallback(value, name, obj)
+    if kind is fields.Boolean:
+        return lambda value, obj: value if value is None or value is True or value is False else fallback(value, name, obj)
+    if kind is fields.DateTime:
+        format_func = field.SERIALIZATION_FUNCS.get(field.format or field.DEFAULT_FORMAT)
+        if format_func is not None:
+            return lambda value, obj: None if value is None else format_func(value)
+    if kind is fields.Nested:
+        return _nested_formatter(field)
+    if kind is fields.List:
+        inner = _formatter(field.inner, name)
+        return lambda value, obj: None if value is None else [inner(each, obj) for each in value]
+    return lambda value, obj: fallback(value, name, obj)
+
+# Inline expressions for the commonest fields; everything else calls its formatter
+INLINE_FORMATS = {
+    fields.Integer: "value if value is None or type(value) is int else int(value)",
+    fields.Float: "value if value is None or type(value) is float else float(value)",
+    fields.String: "value if value is None or type(value) is str else {format}(value, obj)",
+    fields.Email: "value if value is None or type(value) is str else {format}(value, obj)",
+    fields.Boolean: "value if value is None or value is True or value is False else {format}(value, obj)",
+}
+
+def _nested_formatter(field):
+    # Resolved on first use: marshmallow only builds a nested schema once it
+    # has a value to dump, and some declared nested schemas are not valid
+    resolved = []
+
+    def format_nested(value, obj):
+        if not resolved:
+            schema = field.schema
+            resolved.append((compile_schema(schema), schema.many or field.many))
+        dump, many = resolved[0]
+        if value is None:
+            return None
+        return dump(value, many=many)
+    return format_nested
+
+def _build(schema):
+    whole_collection_hooks = any(pass_many for _, pass_many, _ in schema._hooks[POST_DUMP])
+    custom_access = type(schema).get_attribute is not Schema.get_attribute
+    if schema._hooks[PRE_DUMP] or whole_collection_hooks or custom_access:
+        # Left to marshmallow
+        return lambda obj, many=None: schema.dump(obj, many=many)
+
+    namespace = {'missing': missing, 'schema': schema, 'no_state': {}}
+    lines = [
+        "def dump_one(obj, many):",
+        "    state = obj if type(obj) is dict else getattr(obj, '__dict__', no_state)",
+        "    data = {}",
+    ]
+    for i, (name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key if field.data_key is not None else name
+        if not field._CHECK_ATTRIBUTE:
+            namespace[f'field_{i}'] = field
+            lines += [
+                f"    value = field_{i}.serialize({name!r}, obj, accessor=schema.get_attribute)",
+                f"    if value is not missing:",
+                f"        data[{key!r}] = value",
+            ]
+            continue
+
+        attribute = field.attribute or name
+        namespace[f'get_{i}'] = _getter(attribute)
+        namespace[f'format_{i}'] = _formatter(field, name)
+        # Loaded ORM columns and plain attributes live in the instance dict;
+        # anything else (unloaded, properties, dotted paths) goes through getattr
+        if '.' in attribute:
+            lines.append(f"    value = get_{i}(obj)")
+        else:
+            lines += [
+                f"    value = state.get({attribute!r}, missing)",
+                f"    if value is missing:",
+                f"        value = get_{i}(obj)",
+            ]
+
+        default = field.dump_default
+        if default is missing:
+            lines.append(f"    if value is not missing:")
+        else:
+            namespace[f'default_{i}'] = default
+            call = '()' if callable(default) else ''
+            lines += [
+                f"    if value is missing:",
+                f"        value = default_{i}{call}",
+                f"    if True:",
+            ]
+        expression = INLINE_FORMATS.get(type(field), "{format}(value, obj)").format(format=f'format_{i}')
+        if type(field) in (fields.Integer, fields.Float) and field.as_string:
+            expression = f"format_{i}(value, obj)"
+        lines.append(f"        data[{key!r}] = {expression}")
+
+    for i, (attr_name, _, hook_kwargs) in enumerate(schema._hooks[POST_DUMP]):
+        namespace[f'process_{i}'] = getattr(schema, attr_name)
+        original = 'obj, ' if hook_kwargs.get('pass_original', False) else ''
+        lines.append(f"    data = process_{i}(data, {original}many=many)")
+    lines.append("    return data")
+
+    exec(compile("\n".join(lines), f"<serializer {type(schema).__name__}>", 'exec'), namespace)
+    dump_one = namespace['dump_one']
+
+    def dump(obj, many=None):
+        many = schema.many if many is None else many
+        if many:
+            return [dump_one(item, True) for item in obj]
+        return dump_one(obj, False)
+    return dump
+
+def compile_schema(schema):
+    """Serializer for a schema configuration, built once and reused
+
+    The result is called like `schema.dump(obj, many=None)` and returns the
+    same data, but resolves fields, formatters and hooks up front instead of
+    on every row. Schemas are keyed on their class, `only`, `exclude` and
+    `many`, so views that build a new schema per request share one.
+    """
+    key = _config_key(schema)
+    with _lock:
+        dump = _compiled.get(key)
+        if dump is not None:
+            _compiled.move_to_end(key)
+            return dump
+
+    dump = _build(schema)
+    # Sparse fieldsets make the set of configurations unbounded, so keep
+    # the most recently used serializers only
+    with _lock:
+        _compiled[key] = dump
+        while len(_compiled) > COMPILED_MAXSIZE:
+            _compiled.popitem(last=False)
+    return dump
+
+def fast_dump(schema, obj, many=None):
+    """Dump with the precompiled serializer for a schema"""
+    return compile_schema(schema)(obj, many=many)
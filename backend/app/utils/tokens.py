@@ -0,0 +1,42 @@
+"""Verify each distinct JWT once per process"""
+import time
+import flask_jwt_extended
+from flask_jwt_extended import view_decorators
+from .cache import LocalCache
+
+VERIFIED_TOKENS_MAXSIZE = 4096
+VERIFIED_TOKEN_MAX_TTL = 24 * 3600  # seconds; tokens are dropped at `exp` anyway
+# Releases whose request verification decodes through the module-level
+# `decode_token` of view_decorators; tests/test_utils_tokens.py pins this
+SUPPORTED_JWT_EXTENDED = '4.7.'
+
+verified_tokens = LocalCache(maxsize=VERIFIED_TOKENS_MAXSIZE, timeout=VERIFIED_TOKEN_MAX_TTL)
+_library_decode = flask_jwt_extended.decode_token
+
+def decode_token(encoded_token, csrf_value=None, allow_expired=False):
+    """`flask_jwt_extended.decode_token`, keeping verified claims until the token expires
+
+    Signature and claim checks run on the first sight of a token; repeat
+    decodes of the same raw token get the stored claims back. Tokens
+    without an `exp`, CSRF-checked cookie tokens and decodes that allow
+    expiry always take the full path.
+    """
+    if csrf_value is not None or allow_expired:
+        return _library_decode(encoded_token, csrf_value, allow_expired)
+
+    claims = verified_tokens.get(encoded_token)
+    if claims is None:
+        claims = _library_decode(encoded_token)
+        remaining = claims.get('exp', 0) - time.time()
+        if remaining > 0:
+            verified_tokens.set(encoded_token, claims, timeout=remaining)
+    # Callers get their own copy; the stored claims stay as verified
+    return dict(claims)
+
+def clear_verified_tokens():
+    verified_tokens.clear()
+
+def init_tokens(app):
+    """Have jwt_required and verify_jwt_in_request decode through the verified-token LRU"""
+    verified_tokens.maxsize = app.config.get('JWT_VERIFIED_CACHE_SIZE', verified_tokens.maxsize)
+    view_decorators.decode_token = decode_token
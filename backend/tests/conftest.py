@@ -1,6 +1,11 @@
 import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
 from app import create_app
 from app.extensions import db, init_redis, redis_client
+from app.utils.cache import clear_local_cache
+from app.utils.catalog import service_catalog
+from app.utils.blocklist import blocked_users
 from app.config import TestConfig
 from sqlalchemy.orm import scoped_session, sessionmaker
 from flask_jwt_extended import create_access_token
@@ -9,8 +14,11 @@ from app.models import Professional, Customer, Admin, Service
 
 @pytest.fixture(autouse=True)
 def clear_redis():
-    """Clear Redis before each test."""
+    """Clear Redis and the per-process caches before each test."""
     redis_client.flushdb()
+    clear_local_cache()
+    service_catalog.clear()
+    blocked_users.reset()
 
 @pytest.fixture
 def app():
@@ -42,6 +50,21 @@ def session(app):
         db.session.remove()
         db.drop_all()
 
+@pytest.fixture
+def record_queries(session):
+    """Context manager collecting the SQL statements run inside it"""
+    @contextmanager
+    def recorder():
+        statements = []
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return recorder
+
 @pytest.fixture
 def admin(session):
     """Create test admin user"""
@@ -1,6 +1,6 @@
 import pytest
 from app.models import User, Professional, Service, ServiceRequest, Customer, Admin
-from app.extensions import db
+from app.extensions import db, redis_client
 from flask_jwt_extended import create_access_token
 
 @pytest.fixture
@@ -131,6 +131,25 @@ def test_update_user_status_invalid(client, session, auth_headers, sample_users)
     )
     assert response.status_code == 400
 
+def test_get_users_batch(client, session, auth_headers, sample_users):
+    """Test looking up several users by id."""
+    customer, professional = sample_users
+    url = f'/api/admin/users/batch?ids={professional.id},{customer.id}'
+    response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+    assert [u['email'] for u in response.get_json()['items']] == ['professional@test.com', 'customer@test.com']
+    assert not any('password_hash' in u for u in response.get_json()['items'])
+    cached = [redis_client.get(key) for key in redis_client.scan_iter('*users.UserSchema*')]
+    assert cached and not any(b'password_hash' in body for body in cached)
+
+    session.get(User, customer.id).name = 'Renamed Customer'
+    session.commit()
+    data = client.get(url, headers=auth_headers).get_json()
+    assert data['items'][1]['name'] == 'Renamed Customer'
+
+    too_many = ','.join(str(i) for i in range(1, 102))
+    assert client.get(f'/api/admin/users/batch?ids={too_many}', headers=auth_headers).status_code == 400
+
 def test_get_professionals(client, session, auth_headers, sample_users):
     """Test getting all professionals with filters."""
     response = client.get('/api/admin/professionals', headers=auth_headers)
@@ -204,3 +223,130 @@ def test_get_dashboard_stats(client, session, auth_headers, sample_users):
     assert data['total_users'] >= 2  # At least our sample users
     assert data['total_professionals'] >= 1  # One professional
     assert data['total_customers'] >= 1  # One customer
+
+def test_get_metrics(client, session, auth_headers, sample_users):
+    """Test cache metrics are exposed in the Prometheus text format."""
+    client.get('/api/admin/dashboard/stats', headers=auth_headers)
+    client.get('/api/admin/dashboard/stats', headers=auth_headers)
+
+    response = client.get('/api/admin/metrics', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+
+    body = response.get_data(as_text=True)
+    function = 'app.api.admin.get_dashboard_stats'
+    assert f'cache_lookups_total{{function="{function}",result="miss"}}' in body
+    assert f'cache_lookups_total{{function="{function}",result="local_hit"}}' in body
+    assert f'cache_recompute_seconds_count{{function="{function}"}}' in body
+    assert 'cache_stored_bytes_total' in body
+    assert 'cache_hit_ratio{tier="local"}' in body
+    assert 'cache_hit_ratio{tier="redis"}' in body
+
+def test_get_metrics_requires_admin(client, customer_token):
+    """Test non-admins cannot read cache metrics."""
+    response = client.get('/api/admin/metrics', headers={'Authorization': f'Bearer {customer_token}'})
+    assert response.status_code == 401
+
+def test_get_requests_query_count_is_constant(client, session, auth_headers, sample_users, record_queries):
+    """Test listing requests does not issue a query per row."""
+    professional = sample_users[1]
+    services = [Service(name=f'Service {i}', type='cleaning', price=50, time_required='1h') for i in range(6)]
+    customers = [Customer(email=f'customer{i}@test.com', name=f'Customer {i}') for i in range(6)]
+    session.add_all(services + customers)
+    session.commit()
+    session.add_all([
+        ServiceRequest(service_id=service.id, customer_id=customer.id, professional_id=professional.id)
+        for service, customer in zip(services, customers)
+    ])
+    session.commit()
+
+    def count_queries(url):
+        with record_queries() as statements:
+            session.expire_all()
+            response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        assert all('service' in item for item in response.get_json()['items'])
+        return len(statements)
+
+    count_queries('/api/admin/requests?per_page=1')  # resolves and caches the caller's identity
+    assert count_queries('/api/admin/requests?per_page=2') == count_queries('/api/admin/requests?per_page=6')
+
+def test_get_requests_sparse_fields(client, session, auth_headers, sample_users):
+    """Test ?fields= and ?include= trim list items."""
+    customer, professional = sample_users
+    service = Service(name='Cleaning', type='cleaning', price=50, time_required='1h')
+    session.add(service)
+    session.commit()
+    session.add(ServiceRequest(service_id=service.id, customer_id=customer.id, status='requested'))
+    session.commit()
+
+    response = client.get('/api/admin/requests?fields=id,status', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['items'] == [{'id': 1, 'status': 'requested'}]
+
+    response = client.get('/api/admin/requests?fields=id,service.name&include=customer', headers=auth_headers)
+    item = response.get_json()['items'][0]
+    assert set(item) == {'id', 'service', 'customer'}
+    assert item['service'] == {'name': 'Cleaning'}
+    assert item['customer']['email'] == 'customer@test.com'
+
+    response = client.get('/api/admin/requests?include=service', headers=auth_headers)
+    item = response.get_json()['items'][0]
+    assert 'service' in item and 'customer' not in item and 'remarks' in item
+
+    response = client.get('/api/admin/requests?fields=nope', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_list_projection_matches_entities(app, session, auth_headers, sample_users):
+    """Test projected list rows serialize exactly like full entities."""
+    from app.utils.api import paginate_query
+    from app.schemas import UserSchema, ProfessionalSchema, CustomerSchema
+
+    for model, schema in ((User, UserSchema), (Professional, ProfessionalSchema), (Customer, CustomerSchema)):
+        with app.test_request_context('/?per_page=50'):
+            query = model.query.order_by(model.id)
+            assert paginate_query(query, schema(many=True), project=True) == \
+                paginate_query(query, schema(many=True))
+
+def test_stream_users_as_ndjson(client, session, auth_headers, sample_users):
+    """Test the full user list streams as NDJSON regardless of per_page."""
+    import json
+    headers = {**auth_headers, 'Accept': 'application/x-ndjson'}
+    response = client.get('/api/admin/users?per_page=1', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(row['email'] for row in rows) == ['admin@test.com', 'customer@test.com', 'professional@test.com']
+    assert not any('password_hash' in row for row in rows)
+
+def test_stream_requests_as_csv(client, session, auth_headers, sample_users):
+    """Test service requests stream as CSV with nested objects as JSON cells."""
+    import csv, io, json
+    customer = sample_users[0]
+    service = Service(name='Cleaning', type='cleaning', price=50, time_required='1h')
+    session.add(service)
+    session.commit()
+    session.add_all([ServiceRequest(service_id=service.id, customer_id=customer.id) for _ in range(3)])
+    session.commit()
+
+    response = client.get('/api/admin/requests', headers={**auth_headers, 'Accept': 'text/csv'})
+    assert response.status_code == 200
+    assert 'attachment' in response.headers['Content-Disposition']
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 3
+    assert json.loads(rows[0]['service'])['name'] == 'Cleaning'
+    assert rows[0]['status'] == 'requested'
+    assert 'password_hash' not in json.loads(rows[0]['customer'])
+
+def test_lists_leave_out_password_hashes(client, session, auth_headers, sample_users):
+    """Test no user list exposes password hashes, paged or streamed."""
+    for path in ('/api/admin/users', '/api/admin/professionals?status=pending&verified=', '/api/admin/customers'):
+        response = client.get(path, headers=auth_headers)
+        assert response.status_code == 200
+        assert 'password_hash' not in response.get_data(as_text=True)
+
+        response = client.get(path, headers={**auth_headers, 'Accept': 'application/x-ndjson'})
+        assert 'password_hash' not in response.get_data(as_text=True)
@@ -271,6 +271,38 @@ def test_login_success(client, customer_data):
     assert 'user' in data
     assert data['user']['email'] == customer_data['email']
 
+def test_login_token_carries_user_id(app, client, customer_data):
+    """Test login tokens identify the user by id and type"""
+    from flask_jwt_extended import decode_token
+
+    client.post('/api/auth/register', json=customer_data)
+    response = client.post('/api/auth/login', json={
+        'email': customer_data['email'],
+        'password': customer_data['password']
+    })
+    data = json.loads(response.data)
+
+    with app.app_context():
+        claims = decode_token(data['access_token'])
+    assert claims['user_id'] == data['user']['id']
+    assert claims['type'] == 'customer'
+    assert claims['is_admin'] is False
+
+def test_token_without_user_id_still_works(app, client, customer_data):
+    """Test tokens issued before the id claim resolve through the email"""
+    import jwt as pyjwt
+    from flask_jwt_extended import decode_token
+
+    client.post('/api/auth/register', json=customer_data)
+    with app.app_context():
+        claims = decode_token(create_access_token(identity=customer_data['email']))
+    claims.pop('user_id')
+    token = pyjwt.encode(claims, app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+    response = client.get('/api/auth/profile', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert json.loads(response.data)['user']['email'] == customer_data['email']
+
 def test_login_invalid_credentials(client, customer_data):
     """Test login with wrong password"""
     # First register
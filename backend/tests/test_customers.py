@@ -1,5 +1,6 @@
 import pytest
 from app.models import Customer, Service, ServiceRequest
+from app.extensions import redis_client
 from datetime import datetime, timezone
 from flask_jwt_extended import create_access_token
 
@@ -125,6 +126,71 @@ def test_get_request(client, customer, service, auth_headers, session):
     assert data['service']['id'] == service.id
     assert data['status'] == request.status
 
+def test_list_requests_with_cursor(client, customer, service, auth_headers, session):
+    """Test walking the customer's requests with keyset cursors."""
+    same_day = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    dates = [datetime(2024, 1, 1, tzinfo=timezone.utc), same_day, same_day]
+    requests = [
+        ServiceRequest(service_id=service.id, customer_id=customer.id, request_date=date)
+        for date in dates
+    ]
+    session.add_all(requests)
+    session.commit()
+
+    response = client.get('/api/customers/requests?cursor=&per_page=2', headers=auth_headers)
+    assert response.status_code == 200
+    first = response.get_json()
+    assert [r['id'] for r in first['items']] == [requests[2].id, requests[1].id]
+
+    response = client.get(f"/api/customers/requests?cursor={first['next_cursor']}&per_page=2",
+                          headers=auth_headers)
+    second = response.get_json()
+    assert [r['id'] for r in second['items']] == [requests[0].id]
+    assert second['has_next'] is False
+
+def test_get_requests_batch(client, customer, other_customer, service, auth_headers, session):
+    """Test fetching several requests at once only returns the customer's own."""
+    own = ServiceRequest(service_id=service.id, customer_id=customer.id, remarks='Mine')
+    other = ServiceRequest(service_id=service.id, customer_id=other_customer.id)
+    session.add_all([own, other])
+    session.commit()
+
+    url = f'/api/customers/requests/batch?ids={other.id},{own.id},999'
+    response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [r['remarks'] for r in data['items']] == ['Mine']
+    assert data['items'][0]['service']['name'] == service.name
+    assert data['missing'] == [other.id, 999]
+    assert 'password_hash' not in data['items'][0]['customer']
+    cached = [redis_client.get(key) for key in redis_client.scan_iter('*service_requests.ServiceRequestSchema*')]
+    assert cached and not any(b'password_hash' in body for body in cached)
+
+    # Cached payloads are refreshed once the request changes
+    own.remarks = 'Updated'
+    session.commit()
+    data = client.get(url, headers=auth_headers).get_json()
+    assert data['items'][0]['remarks'] == 'Updated'
+
+def test_get_dashboard(client, customer, service, auth_headers, session):
+    """Test the dashboard returns every section and refreshes after a change."""
+    session.add(ServiceRequest(service_id=service.id, customer_id=customer.id, remarks='First'))
+    session.commit()
+
+    response = client.get('/api/customers/dashboard', headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['profile']['user']['email'] == customer.email
+    assert data['stats']['total_requests'] == 1
+    assert [r['remarks'] for r in data['recent_requests']] == ['First']
+    assert [c['type'] for c in data['categories']] == [service.type]
+
+    session.add(ServiceRequest(service_id=service.id, customer_id=customer.id, remarks='Second'))
+    session.commit()
+    data = client.get('/api/customers/dashboard', headers=auth_headers).get_json()
+    assert data['stats']['total_requests'] == 2
+    assert len(data['recent_requests']) == 2
+
 def test_cancel_request(client, customer, service, auth_headers, session):
     """Test canceling a service request."""
     # Create a service request first
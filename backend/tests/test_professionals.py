@@ -186,6 +186,24 @@ def test_get_professional_requests(client, professional_token, service_request):
     data = json.loads(response.data)
     assert len(data['items']) > 0
 
+def test_get_dashboard(client, professional_token, approved_professional, customer, service):
+    """Test the dashboard groups requests into the status buckets"""
+    statuses = [ServiceRequest.STATUS_ASSIGNED, ServiceRequest.STATUS_COMPLETED, ServiceRequest.STATUS_CLOSED]
+    for status in statuses:
+        db.session.add(ServiceRequest(customer_id=customer.id, professional_id=approved_professional.id,
+                                      service_id=service.id, status=status))
+    db.session.commit()
+
+    headers = {'Authorization': f'Bearer {professional_token}'}
+    response = client.get('/api/professionals/dashboard', headers=headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['profile']['email'] == 'pro@test.com'
+    assert [r['status'] for r in data['requests']['new']] == ['assigned']
+    assert data['requests']['active'] == []
+    assert sorted(r['status'] for r in data['requests']['completed']) == ['closed', 'completed']
+    assert data['stats']['total_requests'] == 3
+
 def test_accept_request(client, professional_token, service_request):
     """Test accepting a service request"""
     headers = {'Authorization': f'Bearer {professional_token}'}
@@ -1,6 +1,6 @@
 import json
 import pytest
-from app.models import Service, Admin, db
+from app.models import Service, ServiceRequest, Admin, db
 from app.utils.auth import create_access_token
 from app.extensions import db
 from flask_jwt_extended import create_access_token
@@ -122,11 +122,55 @@ def test_get_single_service(client, sample_services):
     assert data['price'] == 100.0
     assert data['time_required'] == '2 hours'
 
+def test_service_detail_refreshes_after_request(client, service, customer):
+    """Test a new request for a service shows up in its cached detail."""
+    url = f'/api/services/{service.id}/'
+    assert client.get(url).get_json()['requests'] == []
+
+    db.session.add(ServiceRequest(service_id=service.id, customer_id=customer.id))
+    db.session.commit()
+    assert len(client.get(url).get_json()['requests']) == 1
+
+def test_professional_sees_requests_of_their_service(client, service, professional_token):
+    """Test professionals can list requests of the service type they offer."""
+    headers = {'Authorization': f'Bearer {professional_token}'}
+    assert client.get(f'/api/services/{service.id}/requests/', headers=headers).status_code == 200
+
+    other = Service(name='Plumbing', type='maintenance', price=50.0, time_required='1 hour')
+    db.session.add(other)
+    db.session.commit()
+    assert client.get(f'/api/services/{other.id}/requests/', headers=headers).status_code == 403
+
 def test_get_nonexistent_service(client):
     """Test getting a service that doesn't exist."""
     response = client.get('/api/services/999/')
     assert response.status_code == 404
 
+def test_repeated_miss_skips_database(client, record_queries):
+    """Test asking again for a missing service runs no SQL."""
+    assert client.get('/api/services/999/').status_code == 404
+    with record_queries() as statements:
+        assert client.get('/api/services/999/').status_code == 404
+    assert statements == []
+
+    service = Service(name='Late', type='cleaning', price=10.0, time_required='1 hour', id=999)
+    db.session.add(service)
+    db.session.commit()
+    assert client.get('/api/services/999/').status_code == 200
+
+def test_get_services_batch(client, sample_services):
+    """Test getting several services in one call."""
+    ids = [sample_services[2].id, 999, sample_services[0].id, sample_services[2].id]
+    response = client.get(f"/api/services/batch?ids={','.join(map(str, ids))}")
+    assert response.status_code == 200
+
+    data = json.loads(response.data)
+    assert [s['name'] for s in data['items']] == ['Gardening', 'House Cleaning']
+    assert data['missing'] == [999]
+
+    assert client.get('/api/services/batch?ids=1,two').status_code == 400
+    assert client.get('/api/services/batch').status_code == 400
+
 def test_create_service_as_admin(client, auth_headers):
     """Test creating a new service as admin."""
     service_data = {
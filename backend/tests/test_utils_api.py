@@ -5,12 +5,15 @@ from app.utils.api import (
     paginate_query,
     validate_schema,
     get_or_404,
+    get_by,
+    lookup_key,
+    loader_options,
     crud_resource,
     filter_query,
     validate_request_status
 )
 from app.utils.errors import APIError
-from app.models import db
+from app.models import db, Customer, Professional
 
 # Test fixtures and helper classes
 class TestModel(db.Model):
@@ -84,6 +87,76 @@ def test_paginate_query_custom_params(app, test_data):
         assert result['has_next'] is True
         assert result['has_prev'] is True
 
+def test_paginate_query_projection(app, test_data):
+    with app.test_request_context('/?per_page=5'):
+        db.session.expunge_all()
+        entities = paginate_query(TestModel.query, TestSchema(many=True))
+        db.session.expunge_all()
+        rows = paginate_query(TestModel.query, TestSchema(many=True), project=True)
+
+        assert rows == entities
+        assert len(db.session.identity_map) == 0
+
+def test_paginate_query_without_count(app, test_data, monkeypatch):
+    with app.test_request_context('/?page=3&per_page=5&count=none'):
+        monkeypatch.setattr(TestModel.query.__class__, 'count', lambda self: pytest.fail('counted'))
+        result = paginate_query(TestModel.query, TestSchema(many=True))
+
+        assert len(result['items']) == 5
+        assert result['total'] is None
+        assert result['pages'] is None
+        assert result['has_next'] is False
+        assert result['has_prev'] is True
+
+def test_paginate_query_estimated_count(app, test_data):
+    with app.test_request_context('/?per_page=5&count=estimate'):
+        query = TestModel.query.filter_by(status='active')
+        assert paginate_query(query, TestSchema(many=True))['total'] == 15
+
+        # Updates that do not insert or delete rows reuse the cached count
+        db.session.get(TestModel, 1).status = 'inactive'
+        db.session.commit()
+        assert paginate_query(query, TestSchema(many=True))['total'] == 15
+
+        # Inserts drop it
+        db.session.add_all([TestModel(name='New', status='active'), TestModel(name='Newer', status='active')])
+        db.session.commit()
+        assert paginate_query(query, TestSchema(many=True))['total'] == 16
+
+def test_paginate_query_invalid_count(app, test_data):
+    with app.test_request_context('/?count=roughly'):
+        with pytest.raises(APIError) as exc:
+            paginate_query(TestModel.query, TestSchema(many=True))
+        assert exc.value.status_code == 400
+
+def test_paginate_query_cursor_mode(app, test_data):
+    def page(cursor=''):
+        with app.test_request_context(f'/?per_page=6&cursor={cursor}'):
+            return paginate_query(TestModel.query, TestSchema(many=True), keyset=(TestModel.id,))
+
+    first = page()
+    assert [item['id'] for item in first['items']] == [15, 14, 13, 12, 11, 10]
+    assert first['has_prev'] is False
+    assert 'total' not in first
+
+    second = page(first['next_cursor'])
+    assert [item['id'] for item in second['items']] == [9, 8, 7, 6, 5, 4]
+
+    last = page(second['next_cursor'])
+    assert [item['id'] for item in last['items']] == [3, 2, 1]
+    assert last['has_next'] is False
+    assert last['next_cursor'] is None
+
+    back = page(last['prev_cursor'])
+    assert back['items'] == second['items']
+    assert back['has_prev'] is True
+
+def test_paginate_query_invalid_cursor(app, test_data):
+    with app.test_request_context('/?cursor=not-a-cursor'):
+        with pytest.raises(APIError) as exc:
+            paginate_query(TestModel.query, TestSchema(many=True), keyset=(TestModel.id,))
+        assert exc.value.status_code == 400
+
 # Test validate_schema decorator
 def test_validate_schema_valid_data(app):
     @validate_schema(TestSchema)
@@ -132,6 +205,56 @@ def test_get_or_404_nonexistent_item(app):
         assert exc.value.status_code == 404
         assert 'not found' in str(exc.value)
 
+def test_get_by_caches_misses(app, monkeypatch):
+    with app.app_context():
+        assert get_by(TestModel, 'name', 'Missing') is None
+
+        def fail_query(*args, **kwargs):
+            raise AssertionError('a cached miss should not query the database')
+
+        monkeypatch.setattr(db.session, 'query', fail_query)
+        assert get_by(TestModel, 'name', 'Missing') is None
+
+def test_lookups_stay_within_the_subclass(app):
+    with app.app_context():
+        professional = Professional(email='pro@test.com', status='approved')
+        customer = Customer(email='cust@test.com', status='registered')
+        db.session.add_all([professional, customer])
+        db.session.commit()
+
+        assert get_or_404(Customer, customer.id).email == 'cust@test.com'
+        with pytest.raises(APIError) as exc:
+            get_or_404(Customer, professional.id)
+        assert exc.value.status_code == 404
+        assert lookup_key(Customer, 'status', 'approved') is None
+        assert lookup_key(Customer, 'status', 'registered') == customer.id
+
+def test_lookup_key_sees_inserted_rows(app):
+    with app.app_context():
+        assert lookup_key(TestModel, 'name', 'Late') is None
+
+        item = TestModel(name='Late', status='active')
+        db.session.add(item)
+        db.session.commit()
+        assert lookup_key(TestModel, 'name', 'Late') == item.id
+
+        db.session.delete(item)
+        db.session.commit()
+        assert lookup_key(TestModel, 'name', 'Late') is None
+
+def test_loader_options_are_bounded(app, monkeypatch):
+    from app.utils import api
+    monkeypatch.setattr(api, 'LOADER_OPTIONS_MAXSIZE', 2)
+    monkeypatch.setattr(api, '_loader_options', api.OrderedDict())
+
+    first = loader_options(TestSchema(only=('id',)), TestModel)
+    loader_options(TestSchema(only=('name',)), TestModel)
+    assert loader_options(TestSchema(only=('id',)), TestModel) is first
+    loader_options(TestSchema(only=('status',)), TestModel)
+
+    assert len(api._loader_options) == 2
+    assert loader_options(TestSchema(only=('id',)), TestModel) is first
+
 # Test filter_query
 def test_filter_query_single_filter(app, test_data):
     with app.app_context():
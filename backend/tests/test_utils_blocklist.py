@@ -0,0 +1,55 @@
+from app.extensions import db
+from app.models import Customer
+from app.utils.blocklist import blocked_users, BLOCKED_KEY, BLOCKED_TAG, SYNCED_KEY
+from app.utils.cache import redis_client, invalidate_cache
+
+def test_block_rejects_issued_token_without_query(client, customer_token, customer, record_queries):
+    """Test a token issued before a block stops working, with no DB read"""
+    headers = {'Authorization': f'Bearer {customer_token}'}
+    assert client.get('/api/customers/requests', headers=headers).status_code == 200
+
+    customer.block()
+    with record_queries() as statements:
+        response = client.get('/api/customers/requests', headers=headers)
+    assert response.status_code == 401
+    assert statements == []
+
+    customer.unblock()
+    assert client.get('/api/customers/requests', headers=headers).status_code == 200
+
+def test_rollback_leaves_blocklist_alone(session, customer):
+    """Test only committed status changes reach the blocked set"""
+    customer.active = False
+    session.flush()
+    session.rollback()
+
+    assert customer.id not in blocked_users
+    assert not redis_client.exists(BLOCKED_KEY)
+
+def test_workers_reload_on_generation_change(app):
+    """Test a change written by another worker is picked up"""
+    blocked_users.sync()
+    assert 42 not in blocked_users
+    redis_client.sadd(BLOCKED_KEY, 42)
+    invalidate_cache(BLOCKED_TAG)
+    assert 42 in blocked_users
+
+def test_sync_from_database(app, session, customer):
+    """Test the blocked set can be rebuilt from inactive users"""
+    session.add(Customer(email='inactive@test.com', name='Inactive', active=False))
+    session.commit()
+    redis_client.delete(BLOCKED_KEY)
+
+    assert blocked_users.sync() == 1
+    assert db.session.query(Customer.id).filter_by(email='inactive@test.com').scalar() in blocked_users
+    assert customer.id not in blocked_users
+
+def test_empty_redis_is_rebuilt_from_database(app, session, customer):
+    """Test users blocked before Redis held the set are still rejected"""
+    customer.active = False
+    session.commit()
+    redis_client.flushdb()
+    invalidate_cache(BLOCKED_TAG)
+
+    assert customer.id in blocked_users
+    assert redis_client.exists(SYNCED_KEY)
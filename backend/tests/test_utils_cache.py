@@ -0,0 +1,273 @@
+import pytest
+import json
+from app.utils.cache import (
+    cached, memoize, cached_entities, invalidate_cache, redis_client, cache_stats,
+    LocalCache, INVALIDATION_CHANNEL, local_cache, route_key
+)
+
+def test_cached_stores_and_reuses_result(app):
+    """Test a cached function only runs once per key"""
+    with app.app_context():
+        call_count = 0
+
+        @cached(timeout=10, tags=['things'])
+        def get_thing(arg):
+            nonlocal call_count
+            call_count += 1
+            return {'thing': arg}
+
+        assert get_thing('a') == {'thing': 'a'}
+        assert get_thing('a') == {'thing': 'a'}
+        assert call_count == 1
+
+        assert get_thing('b') == {'thing': 'b'}
+        assert call_count == 2
+
+def test_invalidate_cache_drops_tagged_entries(app):
+    """Test invalidating a tag drops only the entries carrying it"""
+    with app.app_context():
+        calls = {'services': 0, 'stats': 0}
+
+        @cached(timeout=10, tags=['services'])
+        def get_services():
+            calls['services'] += 1
+            return ['service']
+
+        @cached(timeout=10, tags=['stats'])
+        def get_stats():
+            calls['stats'] += 1
+            return {'total': 1}
+
+        get_services()
+        get_stats()
+        invalidate_cache('services')
+        get_services()
+        get_stats()
+
+        assert calls == {'services': 2, 'stats': 1}
+
+def test_invalidate_cache_does_not_scan(app, monkeypatch):
+    """Test invalidation bumps a generation instead of walking the keyspace"""
+    with app.app_context():
+        call_count = 0
+
+        @memoize(timeout=10, tags=['services'])
+        def get_services():
+            nonlocal call_count
+            call_count += 1
+            return ['service']
+
+        get_services()
+
+        def fail_scan(*args, **kwargs):
+            raise AssertionError('the keyspace should not be scanned')
+
+        monkeypatch.setattr(redis_client, 'scan_iter', fail_scan)
+        monkeypatch.setattr(redis_client, 'keys', fail_scan)
+        invalidate_cache('services')
+
+        assert int(redis_client.get('cache-gen:services')) == 1
+        get_services()
+        assert call_count == 2
+
+def test_cached_skips_non_json_results(app):
+    """Test tuples and other non-JSON results are returned uncached"""
+    with app.app_context():
+        call_count = 0
+
+        @cached(timeout=10)
+        def create_thing():
+            nonlocal call_count
+            call_count += 1
+            return {'id': 1}, 201
+
+        assert create_thing() == ({'id': 1}, 201)
+        assert create_thing() == ({'id': 1}, 201)
+        assert call_count == 2
+
+def test_local_tier_serves_hits_without_redis(app, monkeypatch):
+    """Test repeated hits are answered by the per-process tier"""
+    with app.app_context():
+        @cached(timeout=10, tags=['services'])
+        def get_services():
+            return ['service']
+
+        get_services()
+
+        def fail_get(*args, **kwargs):
+            raise AssertionError('Redis should not be read on a local hit')
+
+        monkeypatch.setattr(redis_client, 'get', fail_get)
+        assert get_services() == ['service']
+        assert cache_stats()['local_hits'] >= 1
+
+def test_local_tier_is_bounded():
+    """Test the local tier evicts least recently used entries"""
+    local = LocalCache(maxsize=2, timeout=10)
+    local.set('a', 1, ['x'])
+    local.set('b', 2, ['x'])
+    local.get('a')
+    local.set('c', 3, ['y'])
+
+    assert local.get('b') is None
+    assert local.get('a') == 1
+    assert local.get('c') == 3
+
+    local.invalidate('x')
+    assert local.get('a') is None
+    assert local.get('c') == 3
+
+def test_invalidation_is_published(app):
+    """Test invalidations reach other workers over pub/sub"""
+    with app.app_context():
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(INVALIDATION_CHANNEL)
+        pubsub.get_message(timeout=1)
+
+        invalidate_cache('services')
+
+        message = pubsub.get_message(timeout=1)
+        pubsub.close()
+        assert json.loads(message['data']) == ['services']
+
+def test_single_flight_serves_stale_value(app):
+    """Test callers get the stale value while another worker recomputes"""
+    with app.app_context():
+        call_count = 0
+
+        @cached(timeout=10, tags=['stats'], stale_ttl=60)
+        def get_stats():
+            nonlocal call_count
+            call_count += 1
+            return {'calls': call_count}
+
+        assert get_stats() == {'calls': 1}
+
+        # Expire the entry logically and pretend another worker holds the lock
+        key = redis_client.keys('cache:get_stats:*')[0]
+        redis_client.hset(key, 'expires', 0)
+        redis_client.set(f"cache-lock:{key.decode()}", 1)
+        local_cache.clear()
+
+        assert get_stats() == {'calls': 1}
+        assert call_count == 1
+
+        # Once the lock is released the next caller recomputes
+        redis_client.delete(f"cache-lock:{key.decode()}")
+        assert get_stats() == {'calls': 2}
+
+def test_waiter_leaves_owners_lock_alone(app):
+    """Test a caller that gave up waiting does not release another caller's lock"""
+    with app.app_context():
+        @cached(timeout=10, stale_ttl=60, lock_timeout=0.1)
+        def get_report():
+            return {'report': True}
+
+        get_report()
+        key = redis_client.keys('cache:get_report:*')[0].decode()
+        redis_client.delete(key)
+        local_cache.clear()
+        redis_client.set(f"cache-lock:{key}", 'owner-token')
+
+        assert get_report() == {'report': True}
+        assert redis_client.get(f"cache-lock:{key}") == b'owner-token'
+
+        # A caller that takes the lock releases it
+        redis_client.delete(f"cache-lock:{key}", key)
+        local_cache.clear()
+        get_report()
+        assert not redis_client.exists(f"cache-lock:{key}")
+
+def test_early_refresh_recomputes_before_expiry(app, monkeypatch):
+    """Test probabilistic early refresh kicks in before the deadline"""
+    with app.app_context():
+        call_count = 0
+
+        @cached(timeout=10, early_refresh=1.0)
+        def get_stats():
+            nonlocal call_count
+            call_count += 1
+            return {'calls': call_count}
+
+        get_stats()
+        key = redis_client.keys('cache:get_stats:*')[0]
+        redis_client.hset(key, 'delta', 100)
+        local_cache.clear()
+
+        # A draw close to one pushes the effective clock past the deadline
+        monkeypatch.setattr('app.utils.cache.random.random', lambda: 0.999999)
+        assert get_stats() == {'calls': 2}
+
+def test_cached_route_returns_etag_and_304(client, service):
+    """Test cached routes send an ETag and honour If-None-Match"""
+    response = client.get('/api/services/')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    cached_response = client.get('/api/services/')
+    assert cached_response.data == response.data
+    assert cached_response.headers['ETag'] == etag
+
+    not_modified = client.get('/api/services/', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+def test_route_key_canonicalizes_query_string(app):
+    """Test logically identical requests share a key and others do not"""
+    def get_professionals():
+        pass
+
+    def key_for(url):
+        with app.test_request_context(url):
+            return route_key(defaults={'sortBy': 'name'})(get_professionals)
+
+    base = key_for('/api/professionals?service_type=cleaning&available=true')
+    assert key_for('/api/professionals?available=true&service_type=cleaning') == base
+    assert key_for('/api/professionals?service_type=cleaning&available=true&page=1&sortBy=name&q=') == base
+    assert key_for('/api/professionals?service_type=plumbing&available=true') != base
+    assert key_for('/api/professionals?service_type=cleaning&available=true&page=2') != base
+
+def test_route_key_includes_role(app, admin_token, customer_token):
+    """Test callers with different roles never share a cached entry"""
+    from flask_jwt_extended import verify_jwt_in_request
+
+    def get_professionals():
+        pass
+
+    keys = []
+    for token in (admin_token, customer_token):
+        headers = {'Authorization': f'Bearer {token}'}
+        with app.test_request_context('/api/professionals', headers=headers):
+            verify_jwt_in_request()
+            keys.append(route_key()(get_professionals))
+
+    assert 'admin' in keys[0]
+    assert 'customer' in keys[1]
+    assert keys[0] != keys[1]
+
+def test_cached_entities_loads_only_missing_ids(app):
+    """Test batch reads load uncached ids once and reuse per-entity entries"""
+    with app.app_context():
+        loads = []
+
+        def load(ids):
+            loads.append(ids)
+            return {entity_id: {'id': entity_id} for entity_id in ids if entity_id != 3}
+
+        assert cached_entities('things', [1, 2, 3], load, tags=['things']) == {1: {'id': 1}, 2: {'id': 2}}
+        local_cache.clear()
+        assert cached_entities('things', [2, 4], load, tags=['things']) == {2: {'id': 2}, 4: {'id': 4}}
+        assert loads == [[1, 2, 3], [4]]
+
+        invalidate_cache('things')
+        cached_entities('things', [1], load, tags=['things'])
+        assert loads[-1] == [1]
+
+def test_generations_are_bounded(app, monkeypatch):
+    """Test the per-worker generation map forgets the stalest tags"""
+    from app.utils import cache
+    monkeypatch.setattr(cache, 'GENERATIONS_MAXSIZE', 3)
+    with app.app_context():
+        for i in range(5):
+            cache._current_generations([f"user:{i}@test.com"])
+        assert list(cache._generations) == ['user:2@test.com', 'user:3@test.com', 'user:4@test.com']
@@ -0,0 +1,66 @@
+import pytest
+from app.models import Service
+from app.extensions import db
+from app.utils.catalog import service_catalog
+from app.utils.cache import invalidate_cache
+
+@pytest.fixture
+def catalog_services(app):
+    """Create services for catalog tests"""
+    with app.app_context():
+        services = [
+            Service(name="AC Repair", type="repair", price=100, time_required="2h", description="AC repair service"),
+            Service(name="Plumbing", type="plumbing", price=80, time_required="1h", description="Pipe fixing"),
+            Service(name="House Cleaning", type="cleaning", price=150, time_required="3h", description="Cleaning service")
+        ]
+        db.session.add_all(services)
+        db.session.commit()
+        yield services
+
+def test_catalog_filters_and_sorts(app, catalog_services):
+    """Test catalog filtering without the database"""
+    with app.app_context():
+        names = [s['name'] for s in service_catalog.services()]
+        assert names == ["AC Repair", "House Cleaning", "Plumbing"]
+
+        cheapest_first = service_catalog.services(sort_by='price_low', min_price=90)
+        assert [s['price'] for s in cheapest_first] == [100, 150]
+
+        assert [s['name'] for s in service_catalog.services(service_type='Repair')] == ["AC Repair"]
+        assert [s['name'] for s in service_catalog.services(search='pipe')] == ["Plumbing"]
+        assert [c['type'] for c in service_catalog.categories()] == ['cleaning', 'plumbing', 'repair']
+
+def test_catalog_serves_reads_from_snapshot(app, catalog_services, monkeypatch):
+    """Test repeated reads do not query the services table"""
+    with app.app_context():
+        service_catalog.services()
+
+        def fail_query(*args, **kwargs):
+            raise AssertionError('catalog should not hit the database')
+
+        monkeypatch.setattr(Service, 'query', property(fail_query))
+        assert len(service_catalog.services(sort_by='price_high')) == 3
+
+def test_catalog_rebuilds_after_change(app, catalog_services):
+    """Test invalidating the services tag rebuilds the snapshot"""
+    with app.app_context():
+        assert len(service_catalog.services()) == 3
+
+        db.session.add(Service(name="Painting", type="painting", price=200, time_required="4h"))
+        db.session.commit()
+        invalidate_cache('services')
+
+        assert len(service_catalog.services()) == 4
+        assert service_catalog.get(catalog_services[0].id)['name'] == "AC Repair"
+
+def test_catalog_holds_only_service_columns(app, catalog_services, customer):
+    """Test the snapshot leaves out nested requests and professionals"""
+    from app.models import ServiceRequest
+    with app.app_context():
+        db.session.add(ServiceRequest(service_id=catalog_services[0].id, customer_id=customer.id))
+        db.session.commit()
+
+        service = service_catalog.get(catalog_services[0].id)
+        assert 'requests' not in service
+        assert 'professionals' not in service
+        assert 'password_hash' not in str(service_catalog.services())
@@ -0,0 +1,59 @@
+import gzip
+from flask import Flask, jsonify
+from app.config import TestConfig
+from app.utils.compression import compress, init_compression
+
+def make_app():
+    app = Flask(__name__)
+    app.config.from_object(TestConfig)
+    init_compression(app)
+
+    @app.route('/large')
+    def large():
+        return jsonify(items=['x' * 50] * 100)
+
+    @app.route('/small')
+    def small():
+        return jsonify(ok=True)
+
+    @app.route('/raw')
+    @compress(enabled=False)
+    def raw():
+        return jsonify(items=['x' * 50] * 100)
+
+    @app.route('/fast')
+    @compress(level=1)
+    def fast():
+        return jsonify(items=[str(i) * 20 for i in range(500)])
+
+    return app
+
+def test_large_responses_are_gzipped():
+    """Test responses above the threshold are compressed when accepted"""
+    client = make_app().test_client()
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data).startswith(b'{')
+
+def test_small_or_unaccepted_responses_are_untouched():
+    """Test compression needs both a large body and client support"""
+    client = make_app().test_client()
+
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/large').headers
+
+def test_routes_can_opt_out_or_tune_level():
+    """Test per-route overrides of the configured level"""
+    app = make_app()
+    client = app.test_client()
+    headers = {'Accept-Encoding': 'gzip'}
+
+    assert 'Content-Encoding' not in client.get('/raw', headers=headers).headers
+
+    fast = client.get('/fast', headers=headers)
+    app.view_functions['fast'].compress_level = 9
+    best = client.get('/fast', headers=headers)
+    assert gzip.decompress(fast.data) == gzip.decompress(best.data)
+    assert len(best.data) < len(fast.data)
@@ -0,0 +1,61 @@
+from app.models import Customer, Professional
+from app.utils.identity import load_principal, current_user, current_account
+
+def test_warm_request_runs_no_identity_query(client, session, customer_token, customer, record_queries):
+    """Test an uncached view resolves its user from cache once warm"""
+    headers = {'Authorization': f'Bearer {customer_token}'}
+    assert client.get('/api/customers/requests', headers=headers).status_code == 200
+
+    # A new request starts with an empty identity map
+    session.expunge_all()
+    with record_queries() as statements:
+        response = client.get('/api/customers/requests', headers=headers)
+    assert response.status_code == 200
+    # Only the view's own reads of the requests table
+    assert statements and all('service_requests' in statement for statement in statements)
+
+def test_current_account_needs_no_row(app, customer_token, customer, record_queries):
+    """Test the current account is read from the principal, not the users table"""
+    from flask_jwt_extended import verify_jwt_in_request
+
+    with app.test_request_context(headers={'Authorization': f'Bearer {customer_token}'}):
+        verify_jwt_in_request()
+        load_principal(customer.email)
+        with record_queries() as statements:
+            account = current_account(Customer)
+        assert (account.id, account.active) == (customer.id, True)
+        assert current_account(Professional) is None
+    assert statements == []
+
+def test_principal_resolved_once_per_request(app, customer, record_queries):
+    """Test repeated lookups in a request share one resolution"""
+    with app.test_request_context():
+        with record_queries() as statements:
+            first = load_principal('customer@test.com')
+            assert load_principal('customer@test.com') is first
+    assert first == {'id': customer.id, 'email': 'customer@test.com', 'type': 'customer', 'active': True}
+    assert len(statements) == 1
+
+def test_block_refreshes_principal(app, session, customer):
+    """Test blocking a user is seen by the next request"""
+    with app.test_request_context():
+        assert load_principal('customer@test.com')['active'] is True
+
+    customer.block()
+
+    with app.test_request_context():
+        assert load_principal('customer@test.com')['active'] is False
+        assert load_principal('nobody@test.com') is None
+
+def test_current_user_loads_subtype(client, app, customer_token, customer, record_queries):
+    """Test the current user is loaded from its subtype table"""
+    from flask_jwt_extended import verify_jwt_in_request
+
+    with app.test_request_context(headers={'Authorization': f'Bearer {customer_token}'}):
+        verify_jwt_in_request()
+        with record_queries() as statements:
+            user = current_user()
+        assert isinstance(user, Customer)
+        assert not any('email' in statement.split('WHERE')[-1] for statement in statements)
+        assert current_user(Customer) is user
+        assert current_user(Professional) is None
@@ -0,0 +1,56 @@
+from app.extensions import db
+from app.models import Service, ServiceRequest
+from app.utils.cache import tag_generation
+from app.utils import invalidation
+
+def test_service_commit_invalidates_services(session, service):
+    """Test committing a service change bumps the services tag"""
+    before = tag_generation('services')
+    service.price = 150.0
+    session.commit()
+
+    assert tag_generation('services') == before + 1
+
+def test_request_commit_invalidates_owners(session, customer, approved_professional, service):
+    """Test a request change invalidates stats and both users it belongs to"""
+    service_request = ServiceRequest(service_id=service.id, customer_id=customer.id)
+    session.add(service_request)
+    session.commit()
+    assert tag_generation('user:customer@test.com') == 2  # created, then request added
+    assert tag_generation('user:professional@test.com') == 1
+
+    stats = tag_generation('stats')
+    service_request.professional_id = approved_professional.id
+    service_request.status = ServiceRequest.STATUS_ASSIGNED
+    session.commit()
+
+    assert tag_generation('stats') == stats + 1
+    assert tag_generation('user:professional@test.com') == 2
+
+def test_block_invalidates_professional_directory(session, approved_professional):
+    """Test blocking a professional invalidates the directory and their entries"""
+    approved_professional.block()
+
+    assert tag_generation('professionals') == 2
+    assert tag_generation('user:professional@test.com') == 2
+
+def test_one_invalidation_per_transaction(session, monkeypatch):
+    """Test all tags touched by a transaction go out in a single call"""
+    calls = []
+    monkeypatch.setattr(invalidation, 'invalidate_cache', lambda *tags: calls.append(tags))
+
+    session.add(Service(name='Painting', type='painting', price=200, time_required='4h'))
+    session.flush()
+    session.add(Service(name='Plumbing', type='plumbing', price=80, time_required='1h'))
+    session.commit()
+
+    assert calls == [('rows:services', 'services', 'stats')]
+
+def test_rollback_discards_pending_tags(session):
+    """Test rolled back changes do not invalidate anything"""
+    session.add(Service(name='Painting', type='painting', price=200, time_required='4h'))
+    session.flush()
+    session.rollback()
+    db.session.commit()
+
+    assert tag_generation('services') == 0
@@ -0,0 +1,73 @@
+import threading
+import pytest
+from app.extensions import db
+from app.models import User
+from app.utils.passwords import (hash_password, verify_password, needs_rehash,
+                                 HashingOverloaded, _Pool)
+
+FAST_METHOD = 'pbkdf2:sha256:1000'
+
+def test_hash_and_verify(app):
+    """Test hashes use the configured method and verify off the request thread"""
+    app.config['PASSWORD_HASH_METHOD'] = FAST_METHOD
+    with app.app_context():
+        password_hash = hash_password('secret')
+        assert password_hash.startswith(FAST_METHOD + '$')
+        assert verify_password(password_hash, 'secret')
+        assert not verify_password(password_hash, 'wrong')
+        assert not needs_rehash(password_hash)
+
+        app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+        assert needs_rehash(password_hash)
+
+def test_pool_rejects_work_beyond_capacity():
+    """Test a full pool fails fast instead of queueing without bound"""
+    pool = _Pool(workers=1, capacity=0)
+    release = threading.Event()
+    worker = threading.Thread(target=pool.run, args=(release.wait,), kwargs={'timeout': 5})
+    worker.start()
+    try:
+        with pytest.raises(HashingOverloaded):
+            pool.run(lambda: None, timeout=1)
+    finally:
+        release.set()
+        worker.join()
+    assert pool.run(lambda: 'done', timeout=1) == 'done'
+
+def test_pool_enforces_latency_budget():
+    """Test a hash that misses the budget is reported as overload"""
+    pool = _Pool(workers=1, capacity=1)
+    release = threading.Event()
+    try:
+        with pytest.raises(HashingOverloaded) as excinfo:
+            pool.run(release.wait, timeout=0.01)
+        assert excinfo.value.status_code == 503
+    finally:
+        release.set()
+
+def test_login_rehashes_outdated_hash(app, client, customer):
+    """Test logging in upgrades a hash made with older parameters"""
+    app.config['PASSWORD_HASH_METHOD'] = FAST_METHOD
+    response = client.post('/api/auth/login', json={'email': customer.email, 'password': 'password'})
+    assert response.status_code == 200
+
+    user = db.session.get(User, customer.id)
+    db.session.refresh(user)
+    assert user.password_hash.startswith(FAST_METHOD + '$')
+    assert user.check_password('password')
+
+def test_login_skips_rehash_when_pool_is_busy(app, client, customer, monkeypatch):
+    """Test a busy hashing pool delays the upgrade instead of failing the login"""
+    from app import models
+    app.config['PASSWORD_HASH_METHOD'] = FAST_METHOD
+    def overloaded(password):
+        raise HashingOverloaded()
+    monkeypatch.setattr(models, 'hash_password', overloaded)
+
+    response = client.post('/api/auth/login', json={'email': customer.email, 'password': 'password'})
+    assert response.status_code == 200
+    assert response.get_json()['access_token']
+
+    user = db.session.get(User, customer.id)
+    db.session.refresh(user)
+    assert not user.password_hash.startswith(FAST_METHOD + '$')
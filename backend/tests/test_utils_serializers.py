@@ -0,0 +1,42 @@
+from app.models import ServiceRequest, User
+from app.schemas import ServiceRequestSchema, ProfessionalSchema, UserSchema, ServiceSchema
+from app.utils.serializers import compile_schema, fast_dump
+
+def test_fast_dump_matches_marshmallow(session, customer, approved_professional, service):
+    """Test precompiled serializers produce exactly what dump produces"""
+    session.add(ServiceRequest(service_id=service.id, customer_id=customer.id,
+                               professional_id=approved_professional.id, remarks='Soon'))
+    session.add(ServiceRequest(service_id=service.id, customer_id=customer.id))
+    session.commit()
+
+    requests = ServiceRequest.query.all()
+    users = User.query.all()
+    cases = [
+        (ServiceRequestSchema(many=True), requests),
+        (ServiceRequestSchema(), requests[0]),
+        (ServiceRequestSchema(many=True, only=('id', 'status', 'customer.email')), requests),
+        (ProfessionalSchema(many=True), [approved_professional]),
+        (UserSchema(many=True), users),
+        (ServiceSchema(), service),
+    ]
+    for schema, obj in cases:
+        assert fast_dump(schema, obj) == schema.dump(obj)
+
+def test_compiled_serializer_is_shared_per_configuration():
+    """Test views building schemas per request reuse one serializer"""
+    assert compile_schema(ProfessionalSchema(many=True)) is compile_schema(ProfessionalSchema(many=True))
+    assert compile_schema(ProfessionalSchema(many=True)) is not compile_schema(ProfessionalSchema())
+
+def test_compiled_serializers_are_bounded(monkeypatch):
+    """Test only the most recently used configurations stay compiled"""
+    from app.utils import serializers
+    monkeypatch.setattr(serializers, 'COMPILED_MAXSIZE', 2)
+    monkeypatch.setattr(serializers, '_compiled', serializers.OrderedDict())
+
+    first = compile_schema(ServiceSchema(only=('id',)))
+    compile_schema(ServiceSchema(only=('name',)))
+    assert compile_schema(ServiceSchema(only=('id',))) is first
+    compile_schema(ServiceSchema(only=('price',)))
+
+    assert len(serializers._compiled) == 2
+    assert compile_schema(ServiceSchema(only=('id',))) is first
@@ -0,0 +1,57 @@
+import time
+from datetime import timedelta
+import flask_jwt_extended
+from flask_jwt_extended import create_access_token, jwt_manager, view_decorators
+from app.utils import tokens
+
+def count_calls(monkeypatch, module, name):
+    calls = []
+    original = getattr(module, name)
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(module, name, counted)
+    return calls
+
+def test_request_verification_decodes_through_the_lru(app):
+    """Test the installed flask_jwt_extended still decodes requests where init_tokens hooks in"""
+    assert flask_jwt_extended.__version__.startswith(tokens.SUPPORTED_JWT_EXTENDED)
+    assert view_decorators.decode_token is tokens.decode_token
+    assert tokens._library_decode is flask_jwt_extended.utils.decode_token
+
+def test_repeat_requests_skip_decoding(client, customer_token, monkeypatch):
+    """Test a token's signature is checked once, not on every request"""
+    tokens.clear_verified_tokens()
+    decodes = count_calls(monkeypatch, jwt_manager, '_decode_jwt')
+    headers = {'Authorization': f'Bearer {customer_token}'}
+
+    for _ in range(3):
+        assert client.get('/api/customers/requests', headers=headers).status_code == 200
+    assert len(decodes) == 1
+
+def test_role_check_reuses_request_verification(client, customer_token, monkeypatch):
+    """Test role decorators do not decode a token jwt_required already verified"""
+    tokens.clear_verified_tokens()
+    decodes = count_calls(monkeypatch, jwt_manager, '_decode_jwt')
+    headers = {'Authorization': f'Bearer {customer_token}'}
+
+    assert client.get('/api/customers/requests', headers=headers).status_code == 200
+    assert len(decodes) == 1
+
+def test_role_check_sees_the_current_requests_token(client, customer_token, professional_token):
+    """Test a role check never trusts the token of an earlier request"""
+    customer = {'Authorization': f'Bearer {customer_token}'}
+    professional = {'Authorization': f'Bearer {professional_token}'}
+
+    assert client.get('/api/customers/requests', headers=customer).status_code == 200
+    assert client.get('/api/customers/requests', headers=professional).status_code == 401
+
+def test_expired_token_is_not_served_from_cache(app, client, customer):
+    """Test cached claims stop being accepted once the token expires"""
+    with app.app_context():
+        token = create_access_token(identity=customer.email, expires_delta=timedelta(seconds=1))
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert client.get('/api/customers/requests', headers=headers).status_code == 200
+    time.sleep(1.1)
+    assert client.get('/api/customers/requests', headers=headers).status_code == 401